@@ -0,0 +1,12 @@
+// Sends the last view version received (orderApp.changeLog) when the websocket reconnects,
+// so the server replays the missed broadcasts instead of rendering the whole page body.
+htmx.createWebSocket = function (url) {
+    const marker = document.getElementById('ws_version');
+    const version = marker && marker.dataset.version;
+    if (version) {
+        url += (url.includes('?') ? '&' : '?') + 'version=' + encodeURIComponent(version);
+    }
+    const sock = new WebSocket(url, []);
+    sock.binaryType = htmx.config.wsBinaryType;
+    return sock;
+};
@@ -0,0 +1,30 @@
+import asyncio
+import atexit
+import os
+import tempfile
+
+
+def use_test_database():
+    """
+    Run the calling benchmark on a fresh test database, migrated like the configured one and
+    dropped at exit, so its fixtures never touch real data. Call it right after django.setup().
+    """
+    from django.db import connection
+
+    if connection.vendor == "sqlite":
+        # * on disk like the real database, not the in-memory default of the test runner
+        connection.settings_dict["TEST"]["NAME"] = os.path.join(tempfile.mkdtemp(), "benchmark.sqlite3")
+    database_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    atexit.register(connection.creation.destroy_test_db, database_name, verbosity=0)
+
+
+async def wait_for_broker(path):
+    while True:
+        try:
+            _, writer = await asyncio.open_unix_connection(path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            await asyncio.sleep(0.01)
+        else:
+            writer.close()
+            return
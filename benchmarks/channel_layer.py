@@ -0,0 +1,75 @@
+"""
+Group send throughput of the Unix socket broker layer against InMemoryChannelLayer.
+
+    python -m benchmarks.channel_layer [messages] [channels]
+
+The broker runs in its own process, like in production, and every message is a
+rendered broadcast of about 2 KB fanned out to all channels of one group.
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from channels.layers import InMemoryChannelLayer
+
+from benchmarks import wait_for_broker
+from core.unix_layer import UnixSocketChannelLayer
+
+MESSAGES = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+CHANNELS = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+MESSAGE = {"type": "forwardRendered", "message": {"message_type": "membersOrders", "variants": {"default": ["<tr>" + "x" * 2000 + "</tr>"]}}}
+
+
+async def run(layer, concurrent):
+    channels = [await layer.new_channel() for _ in range(CHANNELS)]
+    for channel in channels:
+        await layer.group_add("benchmark", channel)
+
+    async def consume(channel):
+        for _ in range(MESSAGES):
+            await layer.receive(channel)
+
+    consumers = [asyncio.ensure_future(consume(channel)) for channel in channels]
+    start = time.perf_counter()
+    if concurrent:
+        # * many handlers broadcasting in the same loop iteration, like a busy worker
+        for offset in range(0, MESSAGES, 50):
+            await asyncio.gather(*(layer.group_send("benchmark", MESSAGE) for _ in range(min(50, MESSAGES - offset))))
+    else:
+        for _ in range(MESSAGES):
+            await layer.group_send("benchmark", MESSAGE)
+    await asyncio.gather(*consumers)
+    elapsed = time.perf_counter() - start
+    for channel in channels:
+        await layer.group_discard("benchmark", channel)
+    return elapsed
+
+
+def report(name, elapsed):
+    print(f"{name:<32} {elapsed:8.3f}s {MESSAGES / elapsed:10.0f} group sends/s {MESSAGES * CHANNELS / elapsed:12.0f} deliveries/s")
+
+
+async def main():
+    print(f"{MESSAGES} group sends to {CHANNELS} channels")
+    for concurrent in (False, True):
+        mode = "concurrent" if concurrent else "sequential"
+        report(f"in-memory ({mode})", await run(InMemoryChannelLayer(capacity=MESSAGES), concurrent))
+
+        path = os.path.join(tempfile.mkdtemp(), "broker.sock")
+        broker = subprocess.Popen([sys.executable, "-m", "core.unix_layer", path])
+        try:
+            await wait_for_broker(path)
+            layer = UnixSocketChannelLayer(path=path, capacity=MESSAGES)
+            report(f"unix broker ({mode})", await run(layer, concurrent))
+            await layer.close()
+        finally:
+            broker.terminate()
+            broker.wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+"""
+Queries per order selection websocket message, with and without CONFIGURATION_CACHE.
+
+    python -m benchmarks.configuration_queries
+
+Creates its own users, group, room and menu in a throwaway test database
+(benchmarks.use_test_database).
+"""
+
+import asyncio
+import contextlib
+import io
+import os
+from decimal import Decimal
+
+import django
+
+from benchmarks import use_test_database
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+django.setup()
+use_test_database()
+
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+
+from configuration.models import configuration_cache
+from core.sql_tracker import consumer_query_stats
+from orderApp.models import MenuItem, OrderGroup, OrderRoom, Restaurant
+from orderApp.routing import websocket_urlpatterns_order
+
+UserModel = get_user_model()
+application = URLRouter(websocket_urlpatterns_order)
+
+
+async def drain(communicator):
+    while not await communicator.receive_nothing(timeout=0.3):
+        await communicator.receive_from()
+
+
+def connect(path, user):
+    communicator = WebsocketCommunicator(application, path)
+    communicator.scope["user"] = user
+    return communicator
+
+
+async def session(user, order_group, order_room, restaurant, menu_item):
+    communicator = connect(f"/ws/order/{order_group.group_number}/{order_room.room_number}/", user)
+    await communicator.connect()
+    await drain(communicator)
+    messages = [
+        ("addOrderItem", {"fk_restaurant": str(restaurant.pk), "fk_menu_item": str(menu_item.pk), "quantity": "2"}),
+        ("addOrderItem", {"fk_restaurant": str(restaurant.pk), "fk_menu_item": str(menu_item.pk), "quantity": "1"}),
+        ("finishOrder", {}),
+        ("OrdersList", {"all_orders": "True"}),
+        ("groupOrderSummary", {}),
+    ]
+    for message_type, payload in messages:
+        await communicator.send_json_to({"message_type": message_type, **payload})
+        await drain(communicator)
+    await communicator.disconnect()
+
+
+def fixtures():
+    user = UserModel.objects.create_user("bench_user", "bench_user@example.com", "bench")
+    order_group = OrderGroup.objects.create(name="bench_group", fk_owner=user)
+    order_group.add_user_to_group(user=user)
+    order_room = OrderRoom.objects.create(name="bench_room", fk_order_group=order_group)
+    order_room.add_user_to_room(user)
+    restaurant = Restaurant.objects.create(name="bench_restaurant")
+    menu_item = MenuItem.objects.create(fk_restaurant=restaurant, name="bench_item", price=Decimal("12.50"))
+    return user, order_group, order_room, restaurant, menu_item
+
+
+def cleanup():
+    Restaurant.objects.filter(name="bench_restaurant").delete()
+    OrderGroup.objects.filter(name="bench_group").delete()
+    UserModel.objects.filter(username="bench_user").delete()
+
+
+def main():
+    report = {}
+    for cached in (False, True):
+        consumer_query_stats.clear()
+        with override_settings(CONFIGURATION_CACHE=cached, COUNT_CONSUMER_QUERIES=True), contextlib.redirect_stdout(io.StringIO()):
+            try:
+                asyncio.run(session(*fixtures()))
+            finally:
+                cleanup()
+        report[cached] = {label: stats["queries"] / stats["messages"] for label, stats in consumer_query_stats.items()}
+
+    print(f"{'handler':<48} {'uncached':>9} {'cached':>7} {'removed':>8}")
+    for label, queries in report[False].items():
+        cached_queries = report[True].get(label, 0)
+        print(f"{label:<48} {queries:>9.1f} {cached_queries:>7.1f} {queries - cached_queries:>8.1f}")
+    print(f"configuration cache {configuration_cache.stats}")
+
+
+if __name__ == "__main__":
+    main()
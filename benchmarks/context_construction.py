@@ -0,0 +1,82 @@
+"""
+Time to build the full context of every view and resolve its translated strings, per language.
+
+    python -m benchmarks.context_construction [iterations]
+
+Creates its own user, group, room and restaurant in a throwaway test database
+(benchmarks.use_test_database). Data values stay lazy (querysets, LazyContextValue),
+so the timing covers the dict building and the translations a render would resolve.
+"""
+
+import os
+import sys
+import time
+
+import django
+
+from benchmarks import use_test_database
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+django.setup()
+use_test_database()
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import translation
+from django.utils.functional import Promise
+
+from orderApp.models import OrderGroup, OrderRoom, Restaurant
+from orderApp.orderGroupContext import OrderGroupContext
+from orderApp.orderRoomContext import OrderRoomContext
+from orderApp.orderSelectionContext import OrderSelectionContext
+from orderApp.restaurantContext import RestaurantContext
+
+UserModel = get_user_model()
+
+
+def strings(value):
+    # * what the template does with every lazy translation it prints
+    if isinstance(value, Promise):
+        return str(value)
+    if isinstance(value, dict):
+        return [strings(item) for item in value.values()]
+    if isinstance(value, (list, tuple)):
+        return [strings(item) for item in value]
+    return value
+
+
+def fixtures():
+    user = UserModel.objects.create_user("bench_user", "bench_user@example.com", "bench")
+    order_group = OrderGroup.objects.create(name="bench_group", fk_owner=user)
+    order_room = OrderRoom.objects.create(name="bench_room", fk_order_group=order_group)
+    order_room.add_user_to_room(user)
+    Restaurant.objects.create(name="bench_restaurant")
+    return user, order_group, order_room
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    user, order_group, order_room = fixtures()
+    builders = [
+        ("OrderGroupContext", OrderGroupContext(user=user)),
+        ("OrderRoomContext", OrderRoomContext(user=user, order_group=order_group)),
+        ("RestaurantContext", RestaurantContext(user=user)),
+        ("OrderSelectionContext", OrderSelectionContext(user=user, order_group=order_group, order_room=order_room)),
+    ]
+    print(f"{'context':<24} {'language':<9} {'us per build':>13} {'queries':>8}")
+    for language, __ in settings.LANGUAGES:
+        with translation.override(language):
+            for name, builder in builders:
+                strings(builder.get_full_context())
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    for _ in range(iterations):
+                        strings(builder.get_full_context())
+                    elapsed = time.perf_counter() - start
+                print(f"{name:<24} {language:<9} {elapsed / iterations * 1_000_000:>13.1f} {len(queries):>8}")
+
+
+if __name__ == "__main__":
+    main()
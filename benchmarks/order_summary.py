@@ -0,0 +1,256 @@
+"""
+Group order summary aggregation, previous utilities against orderApp.utils.build_order_summary.
+
+    python -m benchmarks.order_summary [rounds] [--database]
+
+Pure Python on generated rows by default. The previous code received three lists
+grouped by the database, the single pass receives one list grouped by restaurant, user,
+item, price and finished. All of them are prepared outside the timing so only the Python
+grouping and totals are compared.
+
+With --database the same rows are stored as order items of a room in a throwaway test
+database (benchmarks.use_test_database) and the previous three queries plus utilities
+are timed against OrderSelectionContext.groupOrderSummary.
+"""
+
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from decimal import Decimal
+from itertools import groupby
+from operator import itemgetter
+
+import django
+
+from benchmarks import use_test_database
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+django.setup()
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import DecimalField, F, Sum
+from django.test.utils import CaptureQueriesContext
+
+from orderApp.models import Order, OrderGroup, OrderItem, OrderRoom
+from orderApp.orderSelectionContext import OrderSelectionContext
+from orderApp.utils import build_order_summary
+
+UserModel = get_user_model()
+SIZES = (1_000, 10_000, 100_000)
+
+
+def generate(size, restaurants=10, items=20, users=50):
+    random.seed(size)
+    menu = [(f"restaurant {r}", f"item {r}-{i}", Decimal(random.randint(100, 5000)) / 100) for r in range(restaurants) for i in range(items)]
+    rows = []
+    for _ in range(size):
+        restaurant, item, price = random.choice(menu)
+        rows.append({"restaurant": restaurant, "item": item, "price": price, "quantity": random.randint(1, 5), "user": f"user {random.randrange(users)}", "finished": random.random() < 0.8})
+    return rows
+
+
+def database_groups(rows, keys, finished_only=False):
+    # * what the previous values()/annotate() queries returned
+    groups = defaultdict(lambda: {"quantity": 0, "total": 0})
+    for row in rows:
+        if finished_only and not row["finished"]:
+            continue
+        group = groups[(row["price"], *(row[key] for key in keys))]
+        group["quantity"] += row["quantity"]
+        group["total"] += row["price"] * row["quantity"]
+    return [{"price": key[0], **dict(zip(keys, key[1:])), **totals} for key, totals in sorted(groups.items())]
+
+
+# * the previous orderApp.utils helpers, only the baseline of this comparison uses them
+def group_nested_data(data, group_keys):
+    """
+    Groups a list of dictionaries by the specified keys.
+
+    :param data: List of dictionaries to be grouped.
+    :param group_keys: List of keys to group by, in order of grouping.
+    :return: Nested dictionary with grouped data.
+    """
+    if not group_keys:
+        return data
+
+    # Sort data by the current group key
+    data = sorted(data, key=itemgetter(group_keys[0]))
+    # To avoid extra list wraps in nested groups
+    if len(group_keys) > 1:
+        grouped_data = defaultdict(dict)
+    else:
+        grouped_data = defaultdict(list)
+
+    # Group by the first key in the group_keys list
+    for key, group in groupby(data, key=itemgetter(group_keys[0])):
+        # If there are more keys to group by, call the function recursively
+        if len(group_keys) > 1:
+            # Group the remaining data by the next key(s)
+            grouped_data[key].update(group_nested_data(list(group), group_keys[1:]))
+        else:
+            # If this is the last key, append the group as is
+            grouped_data[key].extend(list(group))
+
+    # Convert defaultdict to a regular dict for the final output
+    return dict(grouped_data)
+
+
+def calculate_totals(data, keys):
+    """
+    Calculate the total for specified keys across a list of dictionaries.
+
+    :param data: List of dictionaries containing data to sum.
+    :param keys: List of keys to sum up in the dictionaries.
+    :return: Dictionary with the total sums for each specified key.
+    """
+    if not keys:
+        return data
+
+    totals = {key: 0 for key in keys}
+
+    for item in data:
+        for key in keys:
+            value = item.get(key, 0)
+            if isinstance(value, (int, float, Decimal)):
+                totals[key] += value
+
+    return totals
+
+
+def spacial_rounder(dict_in_iterable, fields, round_num):
+    # ! implemented to round output field as it's not supported in sqlite3
+    # https://docs.djangoproject.com/en/5.2/ref/databases/#decimal-handling
+    for item in dict_in_iterable:
+        for field in fields:
+            item[field] = round(item[field], round_num)
+
+
+def previous_summary(orderTotalSummary, orderTotalSummary2, orderUsersSummary):
+    spacial_rounder(orderTotalSummary, ["total", "price"], 2)
+    spacial_rounder(orderTotalSummary2, ["total", "price"], 2)
+    grand_totals_orderTotalSummary = calculate_totals(orderTotalSummary, ["quantity", "total"])
+    orderTotalSummaryGrouped = group_nested_data(orderTotalSummary, ["restaurant"])
+    totals_orderTotalSummary = {restaurant: calculate_totals(items, ["quantity", "total"]) for restaurant, items in orderTotalSummaryGrouped.items()}
+    orderUsersTotalSummaryGrouped = group_nested_data(orderTotalSummary2, ["restaurant", "user"])
+    totals_orderUsersTotalSummaryGrouped = {
+        restaurant: {user: calculate_totals(orders, ["quantity", "total"]) for user, orders in userItems.items()} for restaurant, userItems in orderUsersTotalSummaryGrouped.items()
+    }
+    spacial_rounder(orderUsersSummary, ["total", "price"], 2)
+    orderUsersRestaurantSummaryGrouped = group_nested_data(orderUsersSummary, ["user", "restaurant"])
+    orderUsersSummaryGrouped = group_nested_data(orderUsersSummary, ["user"])
+    totals_orderUsersSummaryGrouped = {user: calculate_totals(items, ["quantity", "total"]) for user, items in orderUsersSummaryGrouped.items()}
+    return {
+        "orderTotalSummaryGrouped": orderTotalSummaryGrouped,
+        "totals_orderTotalSummary": totals_orderTotalSummary,
+        "grand_totals_orderTotalSummary": grand_totals_orderTotalSummary,
+        "orderUsersTotalSummaryGrouped": orderUsersTotalSummaryGrouped,
+        "totals_orderUsersTotalSummaryGrouped": totals_orderUsersTotalSummaryGrouped,
+        "orderUsersRestaurantSummaryGrouped": orderUsersRestaurantSummaryGrouped,
+        "totals_orderUsersSummaryGrouped": totals_orderUsersSummaryGrouped,
+    }
+
+
+def previous_queries(order_room):
+    # * the three grouped queries groupOrderSummary ran before
+    room_items = OrderItem.objects.filter(fk_order__fk_order_room=order_room)
+
+    def summarize(order_items, **group_by):
+        rows = order_items.values("price", **group_by).annotate(items_quantity=Sum("quantity"), items_total=Sum(F("quantity") * F("price"), output_field=DecimalField(max_digits=9, decimal_places=2)))
+        summary = []
+        for row in rows:
+            row["quantity"], row["total"] = row.pop("items_quantity"), row.pop("items_total")
+            summary.append(row)
+        return summary
+
+    return (
+        summarize(room_items, restaurant=F("restaurant_name"), item=F("item_name")),
+        summarize(room_items, restaurant=F("restaurant_name"), item=F("item_name"), user=F("fk_order__fk_user__username")),
+        summarize(room_items.filter(fk_order__finished_ordering=True), user=F("fk_order__fk_user__username"), restaurant=F("restaurant_name"), item=F("item_name")),
+    )
+
+
+def fixtures(rows):
+    usernames = sorted({row["user"] for row in rows})
+    users = {username: UserModel.objects.create_user(f"bench_{username}", f"bench_{index}@example.com", "bench") for index, username in enumerate(usernames)}
+    order_group = OrderGroup.objects.create(name="bench_group", fk_owner=users[usernames[0]])
+    order_room = OrderRoom.objects.create(name="bench_room", fk_order_group=order_group)
+    for user in users.values():
+        order_room.add_user_to_room(user)
+    orders = {(username, finished): Order.objects.create(fk_user=users[username], fk_order_room=order_room, finished_ordering=finished) for username in usernames for finished in (True, False)}
+    # * snapshots only, the summary never reads the menu
+    OrderItem.objects.bulk_create(
+        (OrderItem(fk_order=orders[(row["user"], row["finished"])], quantity=row["quantity"], item_name=row["item"], restaurant_name=row["restaurant"], price=row["price"]) for row in rows),
+        batch_size=2000,
+    )
+    return users[usernames[0]], order_room
+
+
+def cleanup():
+    # ! deleting the items one by one would run the order total/summary signals per item
+    order_pks = list(Order.objects.filter(fk_order_room__name="bench_room").values_list("pk", flat=True))
+    with connection.cursor() as cursor:
+        for start in range(0, len(order_pks), 500):
+            batch = order_pks[start : start + 500]
+            cursor.execute(f"DELETE FROM {OrderItem._meta.db_table} WHERE fk_order_id IN ({', '.join(['%s'] * len(batch))})", batch)
+    OrderGroup.objects.filter(name="bench_group").delete()
+    UserModel.objects.filter(username__startswith="bench_").delete()
+
+
+def database(rounds):
+    use_test_database()
+    print(f"{'rows':>8} {'previous queries':>17} {'previous ms':>12} {'queries':>8} {'single pass ms':>15}")
+    for size in SIZES:
+        try:
+            user, order_room = fixtures(generate(size))
+            context_builder = OrderSelectionContext(user=user, order_room=order_room)
+            with CaptureQueriesContext(connection) as previous_captured:
+                previous_ms, previous = timed(lambda: previous_summary(*previous_queries(order_room)), rounds)
+            with CaptureQueriesContext(connection) as captured:
+                single_ms, single = timed(context_builder.groupOrderSummary, rounds)
+        finally:
+            cleanup()
+        if previous != {key: single[key] for key in previous}:
+            print("summaries differ")
+            sys.exit(1)
+        print(f"{size:>8} {len(previous_captured) // rounds:>17} {previous_ms:>12.1f} {len(captured) // rounds:>8} {single_ms:>15.1f}")
+
+
+def timed(function, rounds, setup=tuple):
+    best, result = None, None
+    for _ in range(rounds):
+        # * spacial_rounder rounds in place, every round gets fresh rows
+        arguments = setup()
+        start = time.perf_counter()
+        result = function(*arguments)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, result
+
+
+def main():
+    arguments = [argument for argument in sys.argv[1:] if argument != "--database"]
+    rounds = int(arguments[0]) if arguments else 5
+    if "--database" in sys.argv:
+        return database(rounds)
+    print(f"{'rows':>8} {'grouped rows':>13} {'previous ms':>12} {'summed rows':>12} {'single pass ms':>15}")
+    for size in SIZES:
+        rows = generate(size)
+        grouped = [
+            database_groups(rows, ["restaurant", "item"]),
+            database_groups(rows, ["restaurant", "item", "user"]),
+            database_groups(rows, ["user", "restaurant", "item"], finished_only=True),
+        ]
+        previous_ms, previous = timed(previous_summary, rounds, lambda: [[dict(row) for row in group] for group in grouped])
+        summed = database_groups(rows, ["restaurant", "user", "item", "finished"])
+        single_ms, single = timed(build_order_summary, rounds, lambda: [summed])
+        if previous != single:
+            print("summaries differ")
+            sys.exit(1)
+        print(f"{size:>8} {sum(map(len, grouped)):>13} {previous_ms:>12.1f} {len(summed):>12} {single_ms:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Queries and render time of the members orders list at 10/100/1000 finished orders per room.
+
+    python -m benchmarks.orders_list [rounds]
+
+Creates its own users, group, room, menu and orders in a throwaway test database
+(benchmarks.use_test_database).
+"""
+
+import os
+import sys
+import time
+from decimal import Decimal
+
+import django
+
+from benchmarks import use_test_database
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+django.setup()
+use_test_database()
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from orderApp.enums import ViewContextKeys as VC
+from orderApp.models import (
+    MenuItem,
+    Order,
+    OrderGroup,
+    OrderItem,
+    OrderRoom,
+    Restaurant,
+)
+from orderApp.orderSelectionContext import OrderSelectionContext
+from orderApp.utils import templates_builder
+
+UserModel = get_user_model()
+SIZES = (10, 100, 1000)
+MEMBERS = 10
+
+
+def fixtures(size):
+    users = [UserModel.objects.create_user(f"bench_user_{index}", f"bench_user_{index}@example.com", "bench") for index in range(MEMBERS)]
+    order_group = OrderGroup.objects.create(name="bench_group", fk_owner=users[0])
+    order_room = OrderRoom.objects.create(name="bench_room", fk_order_group=order_group)
+    for user in users:
+        order_room.add_user_to_room(user)
+    restaurant = Restaurant.objects.create(name="bench_restaurant")
+    menu_items = [MenuItem.objects.create(fk_restaurant=restaurant, name=f"bench_item_{index}", price=Decimal("12.50") + index) for index in range(5)]
+    orders = Order.objects.bulk_create(Order(fk_user=users[index % MEMBERS], fk_order_room=order_room, finished_ordering=True) for index in range(size))
+    order_items = [OrderItem(fk_order=order, fk_menu_item=menu_items[(index + item) % 5], quantity=item + 1) for index, order in enumerate(orders) for item in range(3)]
+    # * bulk_create skips OrderItem.save and the signals keeping the order totals
+    for order_item in order_items:
+        order_item.snapshot_menu_item()
+    OrderItem.objects.bulk_create(order_items)
+    Order.recompute_totals(fk_order_room=order_room)
+    return users[0], order_room
+
+
+def cleanup():
+    Restaurant.objects.filter(name="bench_restaurant").delete()
+    OrderGroup.objects.filter(name="bench_group").delete()
+    UserModel.objects.filter(username__startswith="bench_user_").delete()
+
+
+def render(user, order_room, rounds):
+    context_builder = OrderSelectionContext(user=user, order_room=order_room)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        with CaptureQueriesContext(connection) as queries:
+            context = context_builder.get_list_context(all_orders=True)
+            templates_builder(context, [context[VC.LIST_SECTION_BODY_TEMPLATE]])
+    return len(queries), (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'orders':>7} {'queries':>8} {'ms':>9}")
+    for size in SIZES:
+        try:
+            queries, elapsed = render(*fixtures(size), rounds)
+        finally:
+            cleanup()
+        print(f"{size:>7} {queries:>8} {elapsed:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
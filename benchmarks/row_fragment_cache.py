@@ -0,0 +1,94 @@
+"""
+Full list refresh of the group, room and restaurant views with and without the row fragment cache.
+
+    python -m benchmarks.row_fragment_cache [rows] [rounds]
+
+Creates its own users, groups, rooms and restaurants in a throwaway test database
+(benchmarks.use_test_database). Every list is rendered the way updateGroupsList,
+updateRoomsList and updatePageBody do, uncached, then with a cold and a warm cache, and
+the html must be the same in all three. One row is saved before the last warm round to
+show that only that row renders again. Exits with status 1 when the html differs.
+"""
+
+import os
+import sys
+import time
+
+import django
+
+from benchmarks import use_test_database
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+django.setup()
+use_test_database()
+
+from django.contrib.auth import get_user_model
+from django.test.utils import override_settings
+
+from orderApp.enums import ViewContextKeys as VC
+from orderApp.models import OrderGroup, OrderRoom, Restaurant
+from orderApp.orderGroupContext import OrderGroupContext
+from orderApp.orderRoomContext import OrderRoomContext
+from orderApp.restaurantContext import RestaurantContext
+from orderApp.rowCache import row_cache
+from orderApp.utils import templates_builder
+
+UserModel = get_user_model()
+
+
+def fixtures(size):
+    user = UserModel.objects.create_user("bench_user", "bench_user@example.com", "bench")
+    member = UserModel.objects.create_user("bench_member", "bench_member@example.com", "bench")
+    for index in range(size):
+        # * alternate owners and memberships so every role of the group row renders
+        order_group = OrderGroup.objects.create(name=f"bench_group_{index}", fk_owner=user if index % 2 else member)
+        order_group.add_user_to_group(member)
+        if index % 3:
+            order_group.add_user_to_group(user)
+    room_group = OrderGroup.objects.filter(name="bench_group_1").get()
+    OrderRoom.objects.bulk_create(OrderRoom(name=f"bench_room_{index}", fk_order_group=room_group) for index in range(size))
+    Restaurant.objects.bulk_create(Restaurant(name=f"bench_restaurant_{index}") for index in range(size))
+    return user, room_group
+
+
+def render(context_builder):
+    context = context_builder.get_list_context()
+    start = time.perf_counter()
+    html = "".join(templates_builder(context, [context[VC.LIST_SECTION_BODY_TEMPLATE]]))
+    return (time.perf_counter() - start) * 1000, html
+
+
+def best(context_builder, rounds):
+    timings, html = zip(*(render(context_builder) for _ in range(rounds)))
+    return min(timings), html[-1]
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    user, room_group = fixtures(size)
+    views = [
+        ("groups", OrderGroupContext(user=user), OrderGroup.objects.filter(name="bench_group_0").get()),
+        ("rooms", OrderRoomContext(user=user, order_group=room_group), OrderRoom.objects.filter(name="bench_room_0").get()),
+        ("restaurants", RestaurantContext(user=user), Restaurant.objects.filter(name="bench_restaurant_0").get()),
+    ]
+    print(f"{'list':<12} {'rows':>5} {'uncached ms':>12} {'cold ms':>8} {'warm ms':>8} {'one saved ms':>13}")
+    for name, context_builder, changed in views:
+        row_cache.clear()
+        with override_settings(ROW_FRAGMENT_CACHE_SIZE=0):
+            uncached_ms, uncached = best(context_builder, rounds)
+        cold_ms, cold = render(context_builder)
+        warm_ms, warm = best(context_builder, rounds)
+        changed.save()
+        saved_ms, saved = render(context_builder)
+        if not uncached == cold == warm == saved:
+            print(f"{name}: cached html differs")
+            sys.exit(1)
+        print(f"{name:<12} {size:>5} {uncached_ms:>12.1f} {cold_ms:>8.1f} {warm_ms:>8.1f} {saved_ms:>13.1f}")
+    print()
+    for template_name, entry in row_cache.report():
+        print(template_name, entry)
+
+
+if __name__ == "__main__":
+    main()
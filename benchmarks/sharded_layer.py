@@ -0,0 +1,76 @@
+"""
+Group send throughput of ShardedChannelLayer as shards are added.
+
+    python -m benchmarks.sharded_layer [memory|unix] [messages]
+
+``memory`` uses in-process InMemoryChannelLayer shards, ``unix`` starts one
+core.unix_layer broker process per shard. Messages go round robin to 64 room
+groups of 5 channels each, sent 50 at a time like a busy worker.
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import wait_for_broker
+from core.sharded_layer import ShardedChannelLayer
+
+BACKEND = sys.argv[1] if len(sys.argv) > 1 else "memory"
+MESSAGES = int(sys.argv[2]) if len(sys.argv) > 2 else 4000
+GROUPS = 64
+CHANNELS_PER_GROUP = 5
+MESSAGE = {"type": "forwardRendered", "message": {"message_type": "updateConnectedUsers", "variants": {"default": ["<td>" + "x" * 500 + "</td>"]}}}
+
+
+async def run(layer):
+    groups = [f"GROUP_orderSelection{room}" for room in range(GROUPS)]
+    members = {group: [await layer.new_channel() for _ in range(CHANNELS_PER_GROUP)] for group in groups}
+    for group, channels in members.items():
+        for channel in channels:
+            await layer.group_add(group, channel)
+
+    sends = [groups[index % GROUPS] for index in range(MESSAGES)]
+    expected = {channel: sends.count(group) for group, channels in members.items() for channel in channels}
+
+    async def consume(channel):
+        for _ in range(expected[channel]):
+            await layer.receive(channel)
+
+    consumers = [asyncio.ensure_future(consume(channel)) for channel in expected]
+    await asyncio.sleep(0.1)
+    start = time.perf_counter()
+    for offset in range(0, MESSAGES, 50):
+        await asyncio.gather(*(layer.group_send(group, MESSAGE) for group in sends[offset : offset + 50]))
+    await asyncio.gather(*consumers)
+    return time.perf_counter() - start
+
+
+async def main():
+    print(f"{MESSAGES} group sends over {GROUPS} groups x {CHANNELS_PER_GROUP} channels ({BACKEND} shards)")
+    for count in (1, 2, 4, 8):
+        brokers = []
+        if BACKEND == "unix":
+            directory = tempfile.mkdtemp()
+            paths = [os.path.join(directory, f"broker{index}.sock") for index in range(count)]
+            brokers = [subprocess.Popen([sys.executable, "-m", "core.unix_layer", path]) for path in paths]
+            for path in paths:
+                await wait_for_broker(path)
+            shards = [{"NAME": path, "BACKEND": "core.unix_layer.UnixSocketChannelLayer", "CONFIG": {"path": path, "capacity": MESSAGES}} for path in paths]
+        else:
+            shards = [{"NAME": f"shard{index}", "BACKEND": "channels.layers.InMemoryChannelLayer", "CONFIG": {"capacity": MESSAGES}} for index in range(count)]
+        try:
+            layer = ShardedChannelLayer(shards=shards, capacity=MESSAGES)
+            elapsed = await run(layer)
+            await layer.flush()
+            print(f"{count} shard(s) {elapsed:8.3f}s {MESSAGES / elapsed:10.0f} group sends/s {MESSAGES * CHANNELS_PER_GROUP / elapsed:10.0f} deliveries/s")
+        finally:
+            for broker in brokers:
+                broker.terminate()
+                broker.wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
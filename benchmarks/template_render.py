@@ -0,0 +1,104 @@
+"""
+Render time of the fragments the websocket consumers send, cold vs warm template cache.
+
+    python -m benchmarks.template_render [rounds]
+
+Creates its own user, group, room, restaurant and menu in a throwaway test database
+(benchmarks.use_test_database). Every page body and section template of the four views
+is rendered with the view's full context:
+
+- uncached: a fresh compile of the whole extends/include chain on every render, as without the
+  cached loader
+- cold: first render after the cached loader was reset
+- warm: best render after orderApp.utils.warm_up_templates
+
+Row fragment caching is off so the rows render every time.
+"""
+
+import os
+import sys
+import time
+from decimal import Decimal
+
+import django
+
+from benchmarks import use_test_database
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+django.setup()
+use_test_database()
+
+from django.contrib.auth import get_user_model
+from django.template import engines
+from django.test.utils import override_settings
+
+from orderApp.models import MenuItem, OrderGroup, OrderRoom, Restaurant
+from orderApp.orderGroupContext import OrderGroupContext
+from orderApp.orderRoomContext import OrderRoomContext
+from orderApp.orderSelectionContext import OrderSelectionContext
+from orderApp.restaurantContext import RestaurantContext
+from orderApp.utils import templates_builder, warm_up_templates
+
+UserModel = get_user_model()
+BODY_TEMPLATE = "common/body.html"
+
+
+def fixtures():
+    user = UserModel.objects.create_user("bench_user", "bench_user@example.com", "bench")
+    order_group = OrderGroup.objects.create(name="bench_group", fk_owner=user)
+    order_group.add_user_to_group(user)
+    order_room = OrderRoom.objects.create(name="bench_room", fk_order_group=order_group)
+    order_room.add_user_to_room(user)
+    restaurant = Restaurant.objects.create(name="bench_restaurant")
+    MenuItem.objects.create(fk_restaurant=restaurant, name="bench_item", price=Decimal("2.50"))
+    return user, order_group, order_room
+
+
+def reset_cached_loader():
+    for loader in engines["django"].engine.template_loaders:
+        loader.reset()
+
+
+def timed(context, template_name):
+    start = time.perf_counter()
+    templates_builder(context, [template_name])
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    user, order_group, order_room = fixtures()
+    views = [
+        ("groups", OrderGroupContext(user=user)),
+        ("rooms", OrderRoomContext(user=user, order_group=order_group)),
+        ("restaurants", RestaurantContext(user=user)),
+        ("selection", OrderSelectionContext(user=user, order_group=order_group, order_room=order_room)),
+    ]
+    rows = []
+    with override_settings(ROW_FRAGMENT_CACHE_SIZE=0):
+        for view, context_builder in views:
+            context = context_builder.get_full_context()
+            fragments = [BODY_TEMPLATE, *sorted({value for value in context.values() if isinstance(value, str) and value.endswith(".html")})]
+            for template_name in fragments:
+                # * prime the queries and lazy values so only the template work is timed
+                timed(context, template_name)
+                uncached_ms = []
+                for _ in range(rounds):
+                    reset_cached_loader()
+                    uncached_ms.append(timed(context, template_name))
+                reset_cached_loader()
+                cold_ms = timed(context, template_name)
+                warm_ms = min(timed(context, template_name) for _ in range(rounds))
+                rows.append((view, template_name, min(uncached_ms), cold_ms, warm_ms))
+    reset_cached_loader()
+    start = time.perf_counter()
+    names = warm_up_templates()
+    warm_up_ms = (time.perf_counter() - start) * 1000
+    print(f"{'view':<12} {'fragment':<58} {'uncached ms':>12} {'cold ms':>8} {'warm ms':>8}")
+    for view, template_name, uncached_ms, cold_ms, warm_ms in rows:
+        print(f"{view:<12} {template_name:<58} {uncached_ms:>12.2f} {cold_ms:>8.2f} {warm_ms:>8.2f}")
+    print(f"\nwarm_up_templates: {len(names)} templates in {warm_up_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
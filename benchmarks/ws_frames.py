@@ -0,0 +1,109 @@
+"""
+Websocket frames and bytes sent per order selection handler, with and without WS_SINGLE_FRAME.
+
+    python -m benchmarks.ws_frames
+
+Creates its own users, group, room and menu in a throwaway test database
+(benchmarks.use_test_database).
+"""
+
+import asyncio
+import os
+from decimal import Decimal
+
+import django
+
+from benchmarks import use_test_database
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+django.setup()
+use_test_database()
+
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+
+from orderApp.models import MenuItem, OrderGroup, OrderRoom, Restaurant
+from orderApp.routing import websocket_urlpatterns_order
+
+UserModel = get_user_model()
+application = URLRouter(websocket_urlpatterns_order)
+
+
+async def frames(communicator):
+    sent = []
+    while not await communicator.receive_nothing(timeout=0.3):
+        sent.append(await communicator.receive_from())
+    return len(sent), sum(len(frame.encode()) for frame in sent)
+
+
+def connect(path, user):
+    communicator = WebsocketCommunicator(application, path)
+    communicator.scope["user"] = user
+    return communicator
+
+
+async def session(user, member, order_group, order_room, restaurant, menu_item):
+    path = f"/ws/order/{order_group.group_number}/{order_room.room_number}/"
+    results = {}
+    sender, receiver = connect(path, user), connect(path, member)
+    await sender.connect()
+    results["connect (updatePageBody)"] = await frames(sender)
+    await receiver.connect()
+    await frames(receiver)
+    await frames(sender)
+
+    messages = [
+        ("addOrderItem", {"fk_restaurant": str(restaurant.pk), "fk_menu_item": str(menu_item.pk), "quantity": "2"}),
+        ("finishOrder", {}),
+        ("OrdersList", {"all_orders": "True"}),
+        ("groupOrderSummary", {}),
+    ]
+    for message_type, payload in messages:
+        await sender.send_json_to({"message_type": message_type, **payload})
+        results[message_type] = await frames(sender)
+        if message_type == "finishOrder":
+            results["membersOrders (broadcast)"] = await frames(receiver)
+    await sender.disconnect()
+    await receiver.disconnect()
+    return results
+
+
+def fixtures():
+    user = UserModel.objects.create_user("bench_user", "bench_user@example.com", "bench")
+    member = UserModel.objects.create_user("bench_member", "bench_member@example.com", "bench")
+    order_group = OrderGroup.objects.create(name="bench_group", fk_owner=user)
+    order_group.add_user_to_group(user=user)
+    order_group.add_user_to_group(user=member)
+    order_room = OrderRoom.objects.create(name="bench_room", fk_order_group=order_group)
+    order_room.add_user_to_room(user)
+    order_room.add_user_to_room(member)
+    restaurant = Restaurant.objects.create(name="bench_restaurant")
+    menu_item = MenuItem.objects.create(fk_restaurant=restaurant, name="bench_item", price=Decimal("12.50"))
+    return user, member, order_group, order_room, restaurant, menu_item
+
+
+def cleanup():
+    Restaurant.objects.filter(name="bench_restaurant").delete()
+    OrderGroup.objects.filter(name="bench_group").delete()
+    UserModel.objects.filter(username__in=["bench_user", "bench_member"]).delete()
+
+
+def main():
+    report = {}
+    for single_frame in (False, True):
+        with override_settings(WS_SINGLE_FRAME=single_frame):
+            try:
+                report[single_frame] = asyncio.run(session(*fixtures()))
+            finally:
+                cleanup()
+
+    print(f"{'handler':<28} {'frames':>7} {'bytes':>8}   {'frames':>7} {'bytes':>8}   (per fragment / single frame)")
+    for handler, (frame_count, size) in report[False].items():
+        single_count, single_size = report[True][handler]
+        print(f"{handler:<28} {frame_count:>7} {size:>8}   {single_count:>7} {single_size:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,10 @@
 from apscheduler.schedulers.background import BackgroundScheduler
-from channels_presence.models import Room
 from django.db.utils import OperationalError
 from django.utils import timezone
 
 from configuration.models import configuration
 from orderApp.models import Order
+from orderApp.presence import get_presence_backend
 
 scheduler = BackgroundScheduler()
 scheduler.start()
@@ -19,14 +19,14 @@ def archive_orders():
 
 def clean_rooms():
     try:
-        Room.objects.prune_rooms()
+        get_presence_backend().prune_rooms()
     except OperationalError as e:
         print(e)
 
 
 def clean_presences():
     try:
-        Room.objects.prune_presences()
+        get_presence_backend().prune_presences()
     except OperationalError as e:
         print(e)
 
@@ -11,7 +11,8 @@ bind = "unix:///run/gunicorn.sock"
 workers = 4 if multiprocessing.cpu_count() * 2 >= 4 else 2  # Adjusted based server CPU count
 
 # The worker class (use `sync` for regular HTTP;or "uvicorn.workers.UvicornWorker" for async)
-worker_class = "uvicorn.workers.UvicornWorker"
+# ! core.websocket.CompressedUvicornWorker is the uvicorn worker skipping permessage-deflate below settings.WS_COMPRESSION_THRESHOLD
+worker_class = "core.websocket.CompressedUvicornWorker"
 
 # Redirect stdout/stderr to specified file in errorlog.
 capture_output = True
@@ -27,3 +28,11 @@ errorlog = "/app/logs/gunicorn/error.log"
 # accesslog = "/app/logs/gunicorn/access.log"
 
 loglevel = "error"
+
+
+def on_starting(server):
+    # ! orderApp.presence.MemoryPresence only counts the sockets of its own worker
+    # * preload_app has set up Django by now
+    from orderApp.presence import check_workers
+
+    check_workers(server.cfg.workers)
@@ -1,3 +1,8 @@
+import os
+import threading
+import time
+
+from django.conf import settings
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from solo.models import SingletonModel
@@ -20,9 +25,63 @@ class Configuration(SingletonModel):
         verbose_name = "Site Configuration"
 
 
+class ConfigurationCache:
+    """
+    The Configuration singleton loaded once per process and reused until it's saved again.
+
+    Saving replaces settings.CONFIGURATION_STAMP_FILE (see configuration.signals), every process
+    compares the file with the one it loaded against, so no worker keeps the old values.
+    The cached instance is shared between threads, treat it as read only.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.configuration = None
+        self.stamp = None
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def read_stamp(self):
+        try:
+            stat = os.stat(settings.CONFIGURATION_STAMP_FILE)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def get(self):
+        # * the stamp is read before loading, a save in between only costs one extra load
+        stamp = self.read_stamp()
+        with self.lock:
+            if self.configuration is not None and self.stamp == stamp:
+                self.stats["hits"] += 1
+                return self.configuration
+            self.stats["misses"] += 1
+        configuration = Configuration.get_solo()
+        with self.lock:
+            self.configuration, self.stamp = configuration, stamp
+        return configuration
+
+    def invalidate(self):
+        with self.lock:
+            self.stats["invalidations"] += 1
+            self.configuration = None
+        # ! a new file rather than a new mtime, mtime alone can be too coarse on some filesystems
+        path = settings.CONFIGURATION_STAMP_FILE
+        try:
+            with open(f"{path}.{os.getpid()}", "w") as stamp_file:
+                stamp_file.write(str(time.time_ns()))
+            os.replace(f"{path}.{os.getpid()}", path)
+        except OSError as e:
+            print(e)
+
+
+configuration_cache = ConfigurationCache()
+
+
 def configuration():
-    return Configuration.get_solo()
+    if not settings.CONFIGURATION_CACHE:
+        return Configuration.get_solo()
+    return configuration_cache.get()
 
 
 def join_retry_limit():
-    return Configuration.get_solo().join_retry_limit
+    return configuration().join_retry_limit
@@ -0,0 +1,12 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from configuration.models import Configuration, configuration_cache
+
+
+@receiver(post_save, sender=Configuration)
+@receiver(post_delete, sender=Configuration)
+def configuration_changed(sender, instance, **kwargs):
+    # * after commit, otherwise another worker could reload the old row against the new stamp
+    transaction.on_commit(configuration_cache.invalidate)
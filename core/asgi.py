@@ -19,6 +19,9 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 django_asgi_app = get_asgi_application()
 
 from orderApp.routing import websocket_urlpatterns_order
+from orderApp.utils import warm_up_templates
+
+warm_up_templates()
 
 application = ProtocolTypeRouter(
     {
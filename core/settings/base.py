@@ -82,7 +82,6 @@ TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
-        "APP_DIRS": True,
         "OPTIONS": {
             "context_processors": [
                 "django.template.context_processors.debug",
@@ -90,6 +89,14 @@ TEMPLATES = [
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
             ],
+            # * compiled templates are kept by the worker whatever DEBUG is, runserver still reloads edited ones
+            # * core.asgi compiles the project templates at boot (orderApp.utils.warm_up_templates)
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    ["django.template.loaders.filesystem.Loader", "django.template.loaders.app_directories.Loader"],
+                ),
+            ],
         },
     },
 ]
@@ -175,7 +182,60 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 #     },
 # }
 
-CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+# "memory" only reaches sockets of the same process, "unix" goes through the broker of core/unix_layer.py
+# so group sends reach every gunicorn worker (supervisor runs the broker on CHANNEL_BROKER_SOCKET)
+CHANNEL_LAYER = os.environ.get("CHANNEL_LAYER", "memory")
+CHANNEL_BROKER_SOCKET = os.environ.get("CHANNEL_BROKER_SOCKET", "/run/channel_broker.sock")
+
+# "sharded" spreads groups over one broker per path of CHANNEL_BROKER_SOCKETS (comma separated), see core/sharded_layer.py
+CHANNEL_BROKER_SOCKETS = os.environ.get("CHANNEL_BROKER_SOCKETS", CHANNEL_BROKER_SOCKET)
+
+if CHANNEL_LAYER == "unix":
+    CHANNEL_LAYERS = {"default": {"BACKEND": "core.unix_layer.UnixSocketChannelLayer", "CONFIG": {"path": CHANNEL_BROKER_SOCKET}}}
+elif CHANNEL_LAYER == "sharded":
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "core.sharded_layer.ShardedChannelLayer",
+            "CONFIG": {"shards": [{"NAME": path, "BACKEND": "core.unix_layer.UnixSocketChannelLayer", "CONFIG": {"path": path}} for path in CHANNEL_BROKER_SOCKETS.split(",")]},
+        }
+    }
+else:
+    CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+# Serve the order selection websocket with the async consumer (orderApp.asyncConsumers)
+ASYNC_ORDER_SELECTION_CONSUMER = os.environ.get("ASYNC_ORDER_SELECTION_CONSUMER", "False") == "True"
+
+# Where websocket presence (rooms, channel names, last seen) is tracked:
+# "orderApp.presence.DatabasePresence" (django-channels-presence tables, shared by all workers),
+# "orderApp.presence.BrokerPresence" (in the core/unix_layer.py broker, shared by all workers, needs CHANNEL_LAYER="unix")
+# or "orderApp.presence.MemoryPresence" (in process, single worker deployments only, gunicorn refuses it with more workers)
+# the last two make no database writes on connect/disconnect/heartbeat
+PRESENCE_BACKEND = os.environ.get("PRESENCE_BACKEND", "orderApp.presence.DatabasePresence")
+
+# Send all fragments rendered by one websocket handler as a single frame (htmx ws applies every oob child of a frame)
+WS_SINGLE_FRAME = os.environ.get("WS_SINGLE_FRAME", "False") == "True"
+
+# Websocket messages below this many bytes skip permessage-deflate (core.websocket.CompressedUvicornWorker)
+WS_COMPRESSION_THRESHOLD = 512
+
+# Print raw vs deflated bytes per websocket message type (orderApp.traffic) and collapsed updates (orderApp.coalescer),
+# totals every WS_TRAFFIC_REPORT_INTERVAL seconds
+WS_TRAFFIC_STATS = os.environ.get("WS_TRAFFIC_STATS", "False") == "True"
+WS_TRAFFIC_REPORT_INTERVAL = 60
+
+# Broadcasts kept per view (channel group) and process to replay to reconnecting websockets (orderApp.changeLog)
+CHANGE_LOG_SIZE = 200
+
+# Keep the site Configuration in memory per process (configuration.models.ConfigurationCache),
+# saving it replaces CONFIGURATION_STAMP_FILE so every worker on the host reloads it
+CONFIGURATION_CACHE = os.environ.get("CONFIGURATION_CACHE", "True") == "True"
+CONFIGURATION_STAMP_FILE = os.environ.get("CONFIGURATION_STAMP_FILE", os.path.join(BASE_DIR, "configuration.stamp"))
+
+# Rendered list rows kept per process (orderApp.rowCache), keyed by row version, language and viewer role, 0 disables it
+ROW_FRAGMENT_CACHE_SIZE = int(os.environ.get("ROW_FRAGMENT_CACHE_SIZE", "2000"))
+
+# Seconds to coalesce room connect/disconnect bursts into one connected users update (0 sends right away)
+CONNECTED_USERS_UPDATE_WINDOW = 0.25
 
 logging.config.dictConfig(LOGGING)
 
@@ -194,3 +254,9 @@ INVITATIONS_CONFIRMATION_URL_NAME = "invitation:accept-invite"
 INVITATIONS_GONE_ON_ACCEPT_ERROR = False
 
 TRACK_SQL = False
+
+# Print the number of queries run by every websocket message handler (core.sql_tracker.count_queries)
+COUNT_CONSUMER_QUERIES = os.environ.get("COUNT_CONSUMER_QUERIES", "False") == "True"
+
+# Print the time spent in every context section builder and lazy context value (orderApp.context.context_timings)
+TIME_CONTEXT_SECTIONS = os.environ.get("TIME_CONTEXT_SECTIONS", "False") == "True"
@@ -0,0 +1,138 @@
+"""
+Channel layer spreading groups over several backend layers with consistent hashing.
+
+Every group lives on one shard, picked on an md5 hash ring with virtual nodes, so
+adding a shard only moves part of the groups and a broker restart only affects the
+rooms hashed to it. Direct sends go to the shard of the channel name. Since group
+sends deliver on the group's shard, ``receive`` listens on every shard through one
+persistent receive task per shard and channel.
+
+Shards are regular layer configs::
+
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "core.sharded_layer.ShardedChannelLayer",
+            "CONFIG": {
+                "shards": [
+                    {"NAME": "a", "BACKEND": "core.unix_layer.UnixSocketChannelLayer", "CONFIG": {"path": "/run/channel_broker_a.sock"}},
+                    {"NAME": "b", "BACKEND": "channels_redis.core.RedisChannelLayer", "CONFIG": {"hosts": [("10.0.0.2", 6379)]}},
+                ],
+            },
+        },
+    }
+
+Keep ``NAME`` stable, it is what gets hashed on the ring.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import uuid
+
+from channels.layers import BaseChannelLayer
+from django.utils.module_loading import import_string
+
+
+class HashRing:
+    def __init__(self, nodes, replicas=64):
+        self.ring = sorted((self.hash(f"{node}:{replica}"), node) for node in nodes for replica in range(replicas))
+        self.keys = [key for key, _ in self.ring]
+
+    @staticmethod
+    def hash(value):
+        return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+    def get(self, key):
+        return self.ring[bisect.bisect(self.keys, self.hash(key)) % len(self.ring)][1]
+
+
+class ShardReceiver:
+    """Pumps one channel from every shard into a single queue."""
+
+    retry_delay = 1
+
+    def __init__(self, layer, channel):
+        self.channel = channel
+        self.queue = asyncio.Queue(maxsize=layer.get_capacity(channel))
+        self.tasks = [asyncio.ensure_future(self.pump(shard)) for shard in layer.shards.values()]
+
+    async def pump(self, shard):
+        while True:
+            try:
+                message = await shard.receive(self.channel)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # ! one shard down must not stop the others, retry it
+                print(e)
+                await asyncio.sleep(self.retry_delay)
+                continue
+            await self.queue.put(message)
+
+    def stop(self):
+        for task in self.tasks:
+            task.cancel()
+
+
+class ShardedChannelLayer(BaseChannelLayer):
+    extensions = ["groups", "flush"]
+
+    def __init__(self, shards, replicas=64, expiry=60, capacity=100, channel_capacity=None, **kwargs):
+        super().__init__(expiry=expiry, capacity=capacity, **kwargs)
+        self.channel_capacity = self.compile_capacities(channel_capacity or {})
+        self.client_prefix = uuid.uuid4().hex
+        self.shards = {}
+        for index, shard in enumerate(shards):
+            layer = import_string(shard["BACKEND"])(**shard.get("CONFIG", {}))
+            if hasattr(layer, "client_prefix"):
+                # * redis layers only receive specific channels of their own prefix
+                layer.client_prefix = self.client_prefix
+            self.shards[shard.get("NAME", str(index))] = layer
+        self.ring = HashRing(list(self.shards), replicas)
+        self.receivers = {}
+
+    def shard(self, key):
+        return self.shards[self.ring.get(key)]
+
+    async def send(self, channel, message):
+        self.require_valid_channel_name(channel)
+        await self.shard(self.non_local_name(channel)).send(channel, message)
+
+    async def receive(self, channel):
+        self.require_valid_channel_name(channel)
+        receiver = self.receivers.get(channel)
+        if receiver is None:
+            receiver = self.receivers[channel] = ShardReceiver(self, channel)
+        try:
+            return await receiver.queue.get()
+        except asyncio.CancelledError:
+            # * the consumer is gone, stop listening on the shards
+            if receiver.queue.empty() and self.receivers.get(channel) is receiver:
+                del self.receivers[channel]
+                receiver.stop()
+            raise
+
+    async def new_channel(self, prefix="specific"):
+        return f"{prefix}.{self.client_prefix}!{uuid.uuid4().hex}"
+
+    async def flush(self):
+        for receiver in self.receivers.values():
+            receiver.stop()
+        self.receivers.clear()
+        for shard in self.shards.values():
+            if "flush" in shard.extensions:
+                await shard.flush()
+
+    async def group_add(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        await self.shard(group).group_add(group, channel)
+
+    async def group_discard(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        await self.shard(group).group_discard(group, channel)
+
+    async def group_send(self, group, message):
+        self.require_valid_group_name(group)
+        await self.shard(group).group_send(group, message)
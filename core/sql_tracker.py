@@ -1,9 +1,16 @@
+import contextvars
 import threading
 import time
 import traceback
+from collections import Counter, defaultdict
+from contextlib import contextmanager
 
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connections
+from django.db.backends.signals import connection_created
 from django.db.backends.utils import CursorWrapper
+from django.dispatch import receiver
 from django.utils.deprecation import MiddlewareMixin
 
 # Global query storage
@@ -85,3 +92,59 @@ class SqlTracker(MiddlewareMixin):
             # Apply monkey patch
             CursorWrapper.execute = tracking_execute
             CursorWrapper.executemany = tracking_executemany
+
+
+# Per consumer message query counting (settings.COUNT_CONSUMER_QUERIES)
+# the counter lives in a context variable so queries made in sync_to_async threads count for the awaiting handler
+_message_queries = contextvars.ContextVar("message_queries", default=None)
+consumer_query_stats = defaultdict(Counter)
+
+
+def counting_execute(execute, sql, params, many, context):
+    counter = _message_queries.get()
+    if counter is not None:
+        counter["queries"] += 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    if counting_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(counting_execute)
+
+
+def enable_query_counter():
+    connection_created.connect(install_query_counter)
+    for connection in connections.all(initialized_only=True):
+        install_query_counter(None, connection)
+
+
+@receiver(setting_changed)
+def toggle_query_counter(setting, enter, value, **kwargs):
+    # * override_settings(COUNT_CONSUMER_QUERIES=True) after import, wrappers left on open connections are no-ops outside count_queries
+    if setting != "COUNT_CONSUMER_QUERIES":
+        return
+    if value:
+        enable_query_counter()
+    else:
+        connection_created.disconnect(install_query_counter)
+
+
+# ! only wrap connections when counting is on, otherwise every query pays for the extra wrapper call
+if getattr(settings, "COUNT_CONSUMER_QUERIES", False):
+    enable_query_counter()
+
+
+@contextmanager
+def count_queries(label):
+    if not getattr(settings, "COUNT_CONSUMER_QUERIES", False):
+        yield
+        return
+    counter = Counter()
+    token = _message_queries.set(counter)
+    try:
+        yield
+    finally:
+        _message_queries.reset(token)
+        consumer_query_stats[label]["messages"] += 1
+        consumer_query_stats[label]["queries"] += counter["queries"]
+        print(f"[SQL-COUNT] {label}: {counter['queries']} queries")
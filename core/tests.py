@@ -0,0 +1,217 @@
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import time
+from unittest import mock
+
+from channels.layers import InMemoryChannelLayer
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.sharded_layer import HashRing, ShardedChannelLayer, ShardReceiver
+from core.sql_tracker import consumer_query_stats, count_queries, counting_execute
+from core.unix_layer import Broker, UnixSocketChannelLayer
+
+
+class FailingLayer(InMemoryChannelLayer):
+    """Shard whose broker is down for the first ``failures`` receives."""
+
+    def __init__(self, failures=3, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+
+    async def receive(self, channel):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("broker down")
+        return await super().receive(channel)
+
+
+def memory_shards(*names, **config):
+    return [{"NAME": name, "BACKEND": "channels.layers.InMemoryChannelLayer", "CONFIG": config} for name in names]
+
+
+class HashRingTests(SimpleTestCase):
+    keys = [f"GROUP_orderSelection{room}" for room in range(2000)]
+
+    def test_same_nodes_same_placement(self):
+        first, second = HashRing(["a", "b", "c"]), HashRing(["c", "a", "b"])
+        self.assertEqual([first.get(key) for key in self.keys], [second.get(key) for key in self.keys])
+
+    def test_adding_a_node_only_moves_keys_to_it(self):
+        before, after = HashRing(["a", "b", "c"]), HashRing(["a", "b", "c", "d"])
+        moved = [key for key in self.keys if before.get(key) != after.get(key)]
+        self.assertTrue(all(after.get(key) == "d" for key in moved))
+        # * about a quarter of the keys, far from a full reshuffle
+        self.assertLess(len(moved), len(self.keys) * 0.4)
+        self.assertGreater(len(moved), 0)
+
+    def test_keys_spread_over_every_node(self):
+        ring = HashRing(["a", "b"])
+        placed = [ring.get(key) for key in self.keys]
+        self.assertGreater(placed.count("a"), len(self.keys) * 0.3)
+        self.assertGreater(placed.count("b"), len(self.keys) * 0.3)
+
+
+class ShardedChannelLayerTests(SimpleTestCase):
+    def setUp(self):
+        self.layer = ShardedChannelLayer(shards=memory_shards("a", "b"))
+
+    async def test_group_lives_on_its_shard(self):
+        channel = await self.layer.new_channel()
+        for room in range(20):
+            group = f"GROUP_orderSelection{room}"
+            await self.layer.group_add(group, channel)
+            home = self.layer.ring.get(group)
+            for name, shard in self.layer.shards.items():
+                self.assertEqual(group in shard.groups, name == home)
+
+    async def test_group_and_direct_sends_reach_the_channel(self):
+        channel = await self.layer.new_channel()
+        groups = [f"GROUP_orderSelection{room}" for room in range(10)]
+        # * make sure both shards hold a group of the channel
+        self.assertEqual({self.layer.ring.get(group) for group in groups}, {"a", "b"})
+        for group in groups:
+            await self.layer.group_add(group, channel)
+            await self.layer.group_send(group, {"type": "test.message", "group": group})
+        await self.layer.send(channel, {"type": "test.message", "group": None})
+        received = [await asyncio.wait_for(self.layer.receive(channel), 1) for _ in range(len(groups) + 1)]
+        self.assertCountEqual([message["group"] for message in received], [*groups, None])
+        await self.layer.flush()
+
+    async def test_group_discard_stops_delivery(self):
+        channel = await self.layer.new_channel()
+        await self.layer.group_add("GROUP_room", channel)
+        await self.layer.group_discard("GROUP_room", channel)
+        await self.layer.group_send("GROUP_room", {"type": "test.message"})
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(self.layer.receive(channel), 0.1)
+        await self.layer.flush()
+
+
+@mock.patch.object(ShardReceiver, "retry_delay", 0.01)
+class ShardReceiverFailoverTests(SimpleTestCase):
+    async def test_healthy_shard_keeps_delivering_while_another_is_down(self):
+        layer = ShardedChannelLayer(shards=[*memory_shards("a"), {"NAME": "b", "BACKEND": "core.tests.FailingLayer", "CONFIG": {"failures": 1000}}])
+        channel = await layer.new_channel()
+        group = next(f"GROUP_room{room}" for room in range(100) if layer.ring.get(f"GROUP_room{room}") == "a")
+        await layer.group_add(group, channel)
+        with contextlib.redirect_stdout(io.StringIO()):
+            await layer.group_send(group, {"type": "test.message"})
+            message = await asyncio.wait_for(layer.receive(channel), 1)
+            await layer.flush()
+        self.assertEqual(message["type"], "test.message")
+
+    async def test_failed_shard_is_retried(self):
+        layer = ShardedChannelLayer(shards=[*memory_shards("a"), {"NAME": "b", "BACKEND": "core.tests.FailingLayer", "CONFIG": {"failures": 3}}])
+        channel = await layer.new_channel()
+        group = next(f"GROUP_room{room}" for room in range(100) if layer.ring.get(f"GROUP_room{room}") == "b")
+        await layer.group_add(group, channel)
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            receive = asyncio.ensure_future(layer.receive(channel))
+            await layer.group_send(group, {"type": "test.message"})
+            message = await asyncio.wait_for(receive, 1)
+            await layer.flush()
+        self.assertEqual(message["type"], "test.message")
+        self.assertEqual(output.getvalue().count("broker down"), 3)
+
+
+class UnixSocketChannelLayerTests(SimpleTestCase):
+    @contextlib.asynccontextmanager
+    async def layer(self, **config):
+        """A broker on a temporary socket and a layer connected to it."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.path = os.path.join(directory, "broker.sock")
+            broker = Broker()
+            server = await broker.serve(path)
+            layer = UnixSocketChannelLayer(path=path, **config)
+            try:
+                yield broker, layer
+            finally:
+                await layer.close()
+                server.close()
+                broker.expiry_task.cancel()
+                for connection in list(broker.connections.values()):
+                    connection.close()
+
+    @contextlib.asynccontextmanager
+    async def layer_on(self, broker):
+        """Another worker's layer on the broker of ``layer``."""
+        layer = UnixSocketChannelLayer(path=self.path)
+        try:
+            yield layer
+        finally:
+            await layer.close()
+
+    async def test_group_and_direct_sends_reach_the_channel(self):
+        async with self.layer() as (broker, layer):
+            channel = await layer.new_channel()
+            await layer.group_add("GROUP_room", channel)
+            await layer.group_send("GROUP_room", {"type": "test.message", "group": True})
+            await layer.send(channel, {"type": "test.message", "group": False})
+            received = [await asyncio.wait_for(layer.receive(channel), 1) for _ in range(2)]
+        self.assertCountEqual([message["group"] for message in received], [True, False])
+
+    async def test_group_memberships_expire(self):
+        async with self.layer(group_expiry=0.1) as (broker, layer):
+            channel = await layer.new_channel()
+            await layer.group_add("GROUP_room", channel)
+            await asyncio.sleep(0.2)
+            await layer.group_send("GROUP_room", {"type": "test.message"})
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(layer.receive(channel), 0.1)
+        self.assertNotIn("GROUP_room", broker.groups)
+        self.assertEqual(broker.stats["expired"], 1)
+
+    async def test_messages_not_received_in_time_expire(self):
+        async with self.layer(expiry=0.1) as (broker, layer):
+            channel = await layer.new_channel()
+            await layer.send(channel, {"type": "test.message", "late": True})
+            await asyncio.sleep(0.2)
+            await layer.send(channel, {"type": "test.message", "late": False})
+            message = await asyncio.wait_for(layer.receive(channel), 1)
+        self.assertFalse(message["late"])
+
+    async def test_presence_is_shared_by_every_worker(self):
+        async with self.layer() as (broker, first), self.layer_on(broker) as second:
+            channels = [await first.new_channel(), await first.new_channel(), await second.new_channel()]
+            # * the same user twice on the first worker, another user on the second one
+            for channel, user_pk in zip(channels, [1, 1, 2]):
+                layer = first if channel in channels[:2] else second
+                await layer.group_add("GROUP_room", channel)
+                await layer.presence_add("GROUP_room", channel, user_pk, 60)
+            # * frames of one connection keep their order, a count of the second worker waits for its adds
+            await second.presence_count(["GROUP_room"])
+            self.assertEqual(await first.presence_count(["GROUP_room", "GROUP_other"]), {"GROUP_room": 2, "GROUP_other": 0})
+            await first.presence_remove("GROUP_room", channels[0])
+            self.assertEqual(await first.presence_count(["GROUP_room"]), {"GROUP_room": 2})
+            await first.presence_remove("GROUP_room", channels[1])
+            self.assertEqual(await first.presence_count(["GROUP_room"]), {"GROUP_room": 1})
+            self.assertEqual(set(broker.groups["GROUP_room"]), {channels[2]})
+
+    async def test_presences_without_heartbeat_expire(self):
+        async with self.layer() as (broker, layer):
+            channel = await layer.new_channel()
+            await layer.group_add("GROUP_room", channel)
+            await layer.presence_add("GROUP_room", channel, 1, 0)
+            self.assertEqual(await layer.presence_count(["GROUP_room"]), {"GROUP_room": 1})
+            broker.expire_presences(time.monotonic())
+            self.assertEqual(await layer.presence_count(["GROUP_room"]), {"GROUP_room": 0})
+            self.assertNotIn("GROUP_room", broker.groups)
+
+
+class ConsumerQueryCounterTests(TestCase):
+    def test_connections_are_not_wrapped_when_counting_is_off(self):
+        self.assertNotIn(counting_execute, connection.execute_wrappers)
+
+    def test_counting_queries_once_enabled(self):
+        consumer_query_stats.clear()
+        with override_settings(COUNT_CONSUMER_QUERIES=True), contextlib.redirect_stdout(io.StringIO()):
+            self.assertIn(counting_execute, connection.execute_wrappers)
+            with count_queries("test"):
+                get_user_model().objects.count()
+        self.assertEqual(consumer_query_stats["test"], {"messages": 1, "queries": 1})
+        connection.execute_wrappers.remove(counting_execute)
@@ -0,0 +1,453 @@
+"""
+Channel layer shared by the worker processes of one host through a small broker
+listening on a Unix domain socket, no external service needed.
+
+Run the broker with ``python -m core.unix_layer <socket path>`` (supervisor does it in production).
+
+Wire format: every frame is a 4 byte big endian length followed by a JSON object,
+so messages must be JSON serializable (send pks, not model instances).
+Channel names made by ``new_channel`` embed the id of the connection that owns them
+(``specific.<connection id>!<random>``), the broker routes them back to that connection
+and fans a group send out as one ``deliver`` frame per connection listing its channels.
+Frames are buffered and written once per event loop iteration on both sides.
+
+The broker also tracks websocket presence per room (``presence_*`` ops, used by
+orderApp.presence.BrokerPresence), so every worker of the host sees the same connected
+users without database writes. A room is the channel group its sockets join.
+
+Like channels_redis, a group membership expires ``group_expiry`` seconds after its last
+``group_add`` and a message not received within ``expiry`` seconds is dropped. Unlike it,
+the memberships and waiting messages of a worker also go as soon as its broker connection
+closes, and ``expiry`` counts from the arrival in the receiving worker, not from the send.
+"""
+
+import asyncio
+import json
+import os
+import signal
+import struct
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from copy import deepcopy
+
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+
+HEADER = struct.Struct(">I")
+
+
+def dumps(payload):
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def pack(data):
+    return HEADER.pack(len(data)) + data
+
+
+async def read_frame(reader):
+    (length,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+    return json.loads(await reader.readexactly(length))
+
+
+def connection_id(channel):
+    # * "specific.<connection id>!<random>" -> "<connection id>"
+    return channel[: channel.find("!")].rsplit(".", 1)[-1]
+
+
+class FrameWriter:
+    """Buffer frames and write them to the transport in one call per event loop iteration."""
+
+    def __init__(self, writer, high_water=1 << 20):
+        self.writer = writer
+        self.high_water = high_water
+        self.buffer = []
+        self.buffered = 0
+        self.scheduled = False
+
+    def write(self, data):
+        self.buffer.append(pack(data))
+        self.buffered += len(data) + HEADER.size
+        if not self.scheduled:
+            self.scheduled = True
+            asyncio.get_running_loop().call_soon(self.flush)
+
+    def flush(self):
+        self.scheduled = False
+        if self.buffer and not self.writer.is_closing():
+            self.writer.write(b"".join(self.buffer))
+        self.buffer.clear()
+        self.buffered = 0
+
+    def backlog(self):
+        return self.buffered + self.writer.transport.get_write_buffer_size()
+
+    async def drain(self):
+        if self.backlog() > self.high_water:
+            self.flush()
+            await self.writer.drain()
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+class Broker:
+    """Routes channel messages and fans out group sends between layer connections."""
+
+    # * seconds between sweeps of expired group memberships and presences, group sends also skip expired members
+    expiry_interval = 60
+
+    def __init__(self, max_backlog=16 << 20, group_expiry=86400):
+        self.max_backlog = max_backlog
+        self.group_expiry = group_expiry
+        self.connections = {}
+        self.named_channels = {}
+        # * group -> {channel: expiry deadline (time.monotonic)}
+        self.groups = defaultdict(dict)
+        # * room -> {channel: user pk or None}, channel -> rooms, channel -> deadline of its last heartbeat
+        self.presences = defaultdict(dict)
+        self.channel_rooms = defaultdict(set)
+        self.last_seen = {}
+        self.stats = Counter()
+
+    def owner(self, channel):
+        if "!" in channel and connection_id(channel) in self.connections:
+            return self.connections[connection_id(channel)]
+        return self.connections.get(self.named_channels.get(channel))
+
+    def deliver(self, channels, message):
+        """Send ``message`` (already encoded) to ``channels`` with one frame per owning connection."""
+        targets = defaultdict(list)
+        for channel in channels:
+            connection = self.owner(channel)
+            if connection is None:
+                self.stats["dropped"] += 1
+                continue
+            targets[connection].append(channel)
+        for connection, connection_channels in targets.items():
+            if connection.backlog() > self.max_backlog:
+                # ! slow worker, drop like a full channel instead of growing memory
+                self.stats["dropped"] += len(connection_channels)
+                continue
+            connection.write(b'{"op":"deliver","channels":' + dumps(connection_channels) + b',"message":' + message + b"}")
+            self.stats["frames"] += 1
+            self.stats["delivered"] += len(connection_channels)
+
+    def handle_frame(self, client, frame):
+        op = frame["op"]
+        if op == "send":
+            self.deliver([frame["channel"]], dumps(frame["message"]))
+        elif op == "group_send":
+            self.expire_group(frame["group"], time.monotonic())
+            self.deliver(list(self.groups.get(frame["group"], ())), dumps(frame["message"]))
+        elif op == "group_add":
+            self.groups[frame["group"]][frame["channel"]] = time.monotonic() + frame.get("expiry", self.group_expiry)
+        elif op == "group_discard":
+            self.group_discard(frame["group"], frame["channel"])
+        elif op == "presence_add":
+            self.presences[frame["room"]][frame["channel"]] = frame["user"]
+            self.channel_rooms[frame["channel"]].add(frame["room"])
+            self.last_seen[frame["channel"]] = time.monotonic() + frame["max_age"]
+        elif op == "presence_remove":
+            self.remove_presence(frame["room"], frame["channel"])
+        elif op == "presence_touch":
+            if frame["channel"] in self.last_seen:
+                self.last_seen[frame["channel"]] = time.monotonic() + frame["max_age"]
+        elif op == "presence_count":
+            counts = {room: len({user for user in self.presences.get(room, {}).values() if user is not None}) for room in frame["rooms"]}
+            self.deliver([frame["reply"]], dumps({"type": "presence.count", "counts": counts}))
+        elif op == "listen":
+            self.named_channels[frame["channel"]] = client
+        elif op == "unlisten":
+            if self.named_channels.get(frame["channel"]) == client:
+                del self.named_channels[frame["channel"]]
+        elif op == "flush":
+            self.groups.clear()
+            self.named_channels.clear()
+        self.stats[op] += 1
+
+    def expire_group(self, group, now):
+        members = self.groups.get(group)
+        if members is None:
+            return
+        for channel in [channel for channel, deadline in members.items() if deadline <= now]:
+            del members[channel]
+            self.stats["expired"] += 1
+        if not members:
+            del self.groups[group]
+
+    def group_discard(self, group, channel):
+        members = self.groups.get(group)
+        if members is not None:
+            members.pop(channel, None)
+            if not members:
+                del self.groups[group]
+
+    def remove_presence(self, room, channel):
+        """Drop the presence and the group membership of ``channel`` in ``room``."""
+        members = self.presences.get(room)
+        if members is None or channel not in members:
+            return
+        del members[channel]
+        if not members:
+            del self.presences[room]
+        self.channel_rooms[channel].discard(room)
+        if not self.channel_rooms[channel]:
+            del self.channel_rooms[channel]
+            self.last_seen.pop(channel, None)
+        self.group_discard(room, channel)
+
+    def expire_presences(self, now):
+        # * sockets that stopped sending heartbeats without disconnecting
+        for channel in [channel for channel, deadline in self.last_seen.items() if deadline <= now]:
+            for room in list(self.channel_rooms.get(channel, ())):
+                self.remove_presence(room, channel)
+                self.stats["presences_expired"] += 1
+
+    async def sweep(self):
+        # * memberships of channels that were never discarded, in groups nobody sends to anymore
+        while True:
+            await asyncio.sleep(self.expiry_interval)
+            now = time.monotonic()
+            for group in list(self.groups):
+                self.expire_group(group, now)
+            self.expire_presences(now)
+
+    def forget(self, client):
+        """Drop the channels and group memberships owned by a closed connection."""
+        self.connections.pop(client, None)
+        for channel in [channel for channel, owner in self.named_channels.items() if owner == client]:
+            del self.named_channels[channel]
+        for group, members in list(self.groups.items()):
+            for channel in [channel for channel in members if "!" in channel and connection_id(channel) == client]:
+                del members[channel]
+            if not members:
+                del self.groups[group]
+        for channel in [channel for channel in self.channel_rooms if "!" in channel and connection_id(channel) == client]:
+            for room in list(self.channel_rooms[channel]):
+                self.remove_presence(room, channel)
+
+    async def handle(self, reader, writer):
+        connection = FrameWriter(writer)
+        client = None
+        try:
+            while True:
+                frame = await read_frame(reader)
+                if frame["op"] == "hello":
+                    client = frame["client"]
+                    self.connections[client] = connection
+                else:
+                    self.handle_frame(client, frame)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            if client is not None:
+                self.forget(client)
+            connection.close()
+
+    async def serve(self, path):
+        if os.path.exists(path):
+            os.unlink(path)
+        server = await asyncio.start_unix_server(self.handle, path=path)
+        os.chmod(path, 0o770)
+        self.expiry_task = asyncio.ensure_future(self.sweep())
+        return server
+
+
+class BrokerConnection:
+    """One broker connection of a layer, owned by the event loop that opened it."""
+
+    def __init__(self, layer, reader, writer):
+        self.layer = layer
+        self.id = uuid.uuid4().hex
+        self.queues = {}
+        self.closed = False
+        self.out = FrameWriter(writer)
+        self.out.write(dumps({"op": "hello", "client": self.id}))
+        self.reader_task = asyncio.ensure_future(self.read_loop(reader))
+
+    def write(self, payload):
+        self.out.write(dumps(payload))
+
+    def queue(self, channel):
+        if channel not in self.queues:
+            self.queues[channel] = asyncio.Queue(maxsize=self.layer.get_capacity(channel))
+        return self.queues[channel]
+
+    def put(self, channel, message):
+        try:
+            self.queue(channel).put_nowait((time.monotonic() + self.layer.expiry, message))
+        except asyncio.QueueFull:
+            raise ChannelFull(channel)
+
+    async def read_loop(self, reader):
+        try:
+            while True:
+                frame = await read_frame(reader)
+                for index, channel in enumerate(frame["channels"]):
+                    try:
+                        self.put(channel, frame["message"] if index == 0 else deepcopy(frame["message"]))
+                    except ChannelFull:
+                        pass
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.closed = True
+            # * wake up receivers so their consumers close instead of waiting forever
+            for queue in self.queues.values():
+                if queue.empty():
+                    queue.put_nowait(None)
+            self.out.close()
+
+
+class UnixSocketChannelLayer(BaseChannelLayer):
+    """Channel layer backed by the broker at ``path``, one broker connection per event loop."""
+
+    extensions = ["groups", "flush"]
+
+    def __init__(self, path, expiry=60, group_expiry=86400, capacity=100, channel_capacity=None, **kwargs):
+        super().__init__(expiry=expiry, capacity=capacity, **kwargs)
+        self.channel_capacity = self.compile_capacities(channel_capacity or {})
+        self.path = path
+        self.group_expiry = group_expiry
+        self.connections = {}
+        self.clients = {}
+        self.locks = {}
+
+    async def connection(self):
+        loop = asyncio.get_running_loop()
+        connection = self.connections.get(loop)
+        if connection is not None and not connection.closed:
+            return connection
+        async with self.locks.setdefault(loop, asyncio.Lock()):
+            connection = self.connections.get(loop)
+            if connection is None or connection.closed:
+                self.forget_closed_loops()
+                reader, writer = await asyncio.open_unix_connection(self.path)
+                connection = BrokerConnection(self, reader, writer)
+                self.connections[loop] = connection
+                self.clients[connection.id] = connection
+        return connection
+
+    def forget_closed_loops(self):
+        for loop in [loop for loop in self.connections if loop.is_closed()]:
+            self.clients.pop(self.connections.pop(loop).id, None)
+            self.locks.pop(loop, None)
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_channel_name(channel)
+        assert "__asgi_channel__" not in message
+        connection = await self.connection()
+        payload = dumps(message)
+        if "!" in channel and connection_id(channel) == connection.id:
+            # * own channel, skip the broker round trip
+            connection.put(channel, json.loads(payload))
+            return
+        connection.out.write(b'{"op":"send","channel":' + dumps(channel) + b',"message":' + payload + b"}")
+        await connection.out.drain()
+
+    async def receive(self, channel):
+        self.require_valid_channel_name(channel)
+        connection = self.clients.get(connection_id(channel)) if "!" in channel else None
+        listen = connection is None
+        if listen:
+            # * named channel, or a specific name made elsewhere (ShardedChannelLayer), route it here by name
+            connection = await self.connection()
+            if channel not in connection.queues:
+                connection.write({"op": "listen", "channel": channel})
+        queue = connection.queue(channel)
+        if connection.closed and queue.empty():
+            raise ConnectionError("Channel layer broker connection lost")
+        try:
+            while True:
+                entry = await queue.get()
+                # * None wakes up the receivers of a closed connection
+                if entry is None or entry[0] > time.monotonic():
+                    break
+        except asyncio.CancelledError:
+            # * the consumer is gone, drop its queue so closed sockets don't pile up
+            if queue.empty() and connection.queues.get(channel) is queue:
+                del connection.queues[channel]
+                if listen:
+                    connection.write({"op": "unlisten", "channel": channel})
+            raise
+        if entry is None:
+            raise ConnectionError("Channel layer broker connection lost")
+        return entry[1]
+
+    async def new_channel(self, prefix="specific"):
+        connection = await self.connection()
+        return f"{prefix}.{connection.id}!{uuid.uuid4().hex}"
+
+    async def flush(self):
+        connection = await self.connection()
+        connection.write({"op": "flush"})
+        for connection in self.clients.values():
+            connection.queues.clear()
+
+    async def close(self):
+        connection = self.connections.pop(asyncio.get_running_loop(), None)
+        if connection is not None:
+            self.clients.pop(connection.id, None)
+            connection.reader_task.cancel()
+
+    async def group_add(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        (await self.connection()).write({"op": "group_add", "group": group, "channel": channel, "expiry": self.group_expiry})
+
+    async def group_discard(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        (await self.connection()).write({"op": "group_discard", "group": group, "channel": channel})
+
+    async def presence_add(self, room, channel, user_pk, max_age):
+        (await self.connection()).write({"op": "presence_add", "room": room, "channel": channel, "user": user_pk, "max_age": max_age})
+
+    async def presence_remove(self, room, channel):
+        (await self.connection()).write({"op": "presence_remove", "room": room, "channel": channel})
+
+    async def presence_touch(self, channel, max_age):
+        (await self.connection()).write({"op": "presence_touch", "channel": channel, "max_age": max_age})
+
+    async def presence_count(self, rooms, timeout=5):
+        """``{room: distinct connected users}`` for all ``rooms`` from the broker."""
+        connection = await self.connection()
+        reply = await self.new_channel()
+        connection.write({"op": "presence_count", "rooms": list(rooms), "reply": reply})
+        try:
+            return (await asyncio.wait_for(self.receive(reply), timeout))["counts"]
+        finally:
+            connection.queues.pop(reply, None)
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), "Message is not a dict"
+        self.require_valid_group_name(group)
+        connection = await self.connection()
+        connection.out.write(b'{"op":"group_send","group":' + dumps(group) + b',"message":' + dumps(message) + b"}")
+        await connection.out.drain()
+
+
+def run_broker(path):
+    async def main():
+        broker = Broker()
+        server = await broker.serve(path)
+        stop = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            asyncio.get_running_loop().add_signal_handler(signum, stop.set)
+        await stop.wait()
+        # ! close client connections ourselves, workers keep them open and would block the shutdown
+        server.close()
+        broker.expiry_task.cancel()
+        for connection in list(broker.connections.values()):
+            connection.close()
+        os.unlink(path)
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    run_broker(sys.argv[1] if len(sys.argv) > 1 else os.environ.get("CHANNEL_BROKER_SOCKET", "/run/channel_broker.sock"))
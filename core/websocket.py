@@ -0,0 +1,55 @@
+"""
+Uvicorn worker adding a compression threshold to permessage-deflate.
+
+Uvicorn already negotiates permessage-deflate (``ws_per_message_deflate`` is on by default)
+and compresses every message. This worker keeps the negotiation but sends messages shorter
+than ``settings.WS_COMPRESSION_THRESHOLD`` bytes uncompressed (RSV1 unset), which
+permessage-deflate allows per message, since small count/row updates don't shrink enough
+to pay for the deflate call. orderApp.traffic reports the bytes it saves.
+Daphne (``runserver`` in development) doesn't expose permessage-deflate, so there
+everything goes uncompressed.
+"""
+
+from django.conf import settings
+from uvicorn.protocols.websockets.websockets_impl import WebSocketProtocol
+from uvicorn.workers import UvicornWorker
+from websockets import frames
+from websockets.extensions.permessage_deflate import (
+    PerMessageDeflate,
+    ServerPerMessageDeflateFactory,
+)
+
+
+class ThresholdPerMessageDeflate(PerMessageDeflate):
+    threshold = 0
+
+    def encode(self, frame):
+        # * only whole messages are skipped, a fragmented message must be compressed as a whole
+        if frame.opcode in (frames.OP_TEXT, frames.OP_BINARY) and frame.fin and len(frame.data) < self.threshold:
+            return frame
+        return super().encode(frame)
+
+
+class ThresholdPerMessageDeflateFactory(ServerPerMessageDeflateFactory):
+    def process_request_params(self, params, accepted_extensions):
+        response_params, extension = super().process_request_params(params, accepted_extensions)
+        extension = ThresholdPerMessageDeflate(
+            extension.remote_no_context_takeover,
+            extension.local_no_context_takeover,
+            extension.remote_max_window_bits,
+            extension.local_max_window_bits,
+            extension.compress_settings,
+        )
+        extension.threshold = settings.WS_COMPRESSION_THRESHOLD
+        return response_params, extension
+
+
+class CompressedWebSocketProtocol(WebSocketProtocol):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.config.ws_per_message_deflate:
+            self.available_extensions = [ThresholdPerMessageDeflateFactory()]
+
+
+class CompressedUvicornWorker(UvicornWorker):
+    CONFIG_KWARGS = {**UvicornWorker.CONFIG_KWARGS, "ws": CompressedWebSocketProtocol}
@@ -75,6 +75,7 @@ if [ "$DJANGO_DEVELOPMENT" = "False" ]; then
 		fi
 
 		python manage.py migrate
+		python manage.py backfill_order_item_snapshots
 		mkdir -p "$(dirname "$MARKER_FILE")"
 		touch "$MARKER_FILE"
 		echo "Migrations complete; marker file created at $MARKER_FILE."
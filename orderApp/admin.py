@@ -20,7 +20,8 @@ class MenuItemAdmin(admin.ModelAdmin):
 
 class OrderItemInlineAdmin(admin.TabularInline):
     model = OrderItem
-    fields = ["fk_menu_item", "quantity"]
+    fields = ["fk_menu_item", "quantity", "price"]
+    readonly_fields = ["price"]
     extra = 0
     autocomplete_fields = ["fk_menu_item"]
 
@@ -28,6 +29,14 @@ class OrderItemInlineAdmin(admin.TabularInline):
 class OrderAdmin(admin.ModelAdmin):
     inlines = [OrderItemInlineAdmin]
     autocomplete_fields = ["fk_user", "fk_order_room"]
+    readonly_fields = ["total", "items_count"]
+
+    def save_formset(self, request, form, formset, change):
+        for inline_form in formset.forms:
+            if "fk_menu_item" in inline_form.changed_data:
+                # * another menu item was picked, OrderItem.save snapshots it again
+                inline_form.instance.price = None
+        super().save_formset(request, form, formset, change)
 
 
 class OrderRoomAdmin(admin.ModelAdmin):
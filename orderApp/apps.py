@@ -7,6 +7,15 @@ class OrderappConfig(AppConfig):
 
     def ready(self):
         from cleaner import cleaner
+        from orderApp import signals  # noqa: F401
+        from orderApp.orderGroupContext import OrderGroupContext
+        from orderApp.orderRoomContext import OrderRoomContext
+        from orderApp.orderSelectionContext import OrderSelectionContext
+        from orderApp.restaurantContext import RestaurantContext
+        from orderApp.staticContext import static_contexts
+
+        # * titles, headers and template paths of every view resolved once per language
+        static_contexts.warm_up([OrderGroupContext, OrderRoomContext, RestaurantContext, OrderSelectionContext])
 
         # cleaner()
         return super().ready()
@@ -0,0 +1,351 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from core.sql_tracker import count_queries
+from orderApp.changeLog import change_logs
+from orderApp.coalescer import connected_users_coalescer
+from orderApp.consumers import BaseConsumerMixin
+from orderApp.enums import (
+    ORDER_ROOM_CHANNEL_GROUP,
+    ORDER_SELECTION_CHANNEL_GROUP,
+)
+from orderApp.enums import CurrentViews as CV
+from orderApp.enums import ErrorMessage as EM
+from orderApp.forms import OrderItemForm
+from orderApp.models import OrderGroup, OrderItem, OrderRoom
+from orderApp.orderSelectionContext import (
+    OrderSelectionContext,
+    acreate_order_checks,
+    afinish_order,
+    aget_last_order,
+    aget_order,
+    get_user_order,
+)
+from orderApp.presence import get_presence_backend
+from orderApp.summaryCache import summary_cache
+from orderApp.utils import templates_builder
+
+
+class AsyncBaseConsumer(BaseConsumerMixin, AsyncJsonWebsocketConsumer):
+    """
+    Async counterpart of ``BaseConsumer``.
+
+    ORM lookups use Django's async queryset API, while context building, forms and
+    template rendering run together in a single ``database_sync_to_async`` call per handler.
+    """
+
+    async def connect(self):
+        self.get_user()
+        # ! presence backend (settings.PRESENCE_BACKEND) joins/leaves the channel group and tracks connected users
+        await database_sync_to_async(get_presence_backend().add)(await self.get_channel_group_name(), self.get_channel_name(), self.scope["user"])
+        if self.resync:
+            change_logs.subscribe(await self.get_channel_group_name())
+        await self.accept()
+        await self.after_connect()
+
+    async def after_connect(self):
+        await self.get_context_builder()
+        if not await self.resyncPageBody():
+            await self.updatePageBody()
+
+    async def after_disconnect(self):
+        pass
+
+    async def disconnect(self, close_code):
+        # ! presence backend (settings.PRESENCE_BACKEND) joins/leaves the channel group and tracks connected users
+        await database_sync_to_async(get_presence_backend().remove)(await self.get_channel_group_name(), self.get_channel_name())
+        if self.resync:
+            change_logs.unsubscribe(await self.get_channel_group_name())
+        await self.after_disconnect()
+
+    async def get_channel_group_name(self):
+        if self.channel_group_name is None:
+            raise NotImplementedError("Subclasses must define channel_group_name or implement get_channel_group_name()")
+        return self.channel_group_name
+
+    async def get_context_builder(self):
+        if self.context_builder is None:
+            kwargs = await self.get_context_builder_kwargs()
+            self.context_builder = await database_sync_to_async(self.get_context_class())(**kwargs)
+        return self.context_builder
+
+    async def get_context_builder_kwargs(self):
+        return {"user": self.get_user()}
+
+    async def receive_json(self, content, **kwargs):
+        event_type, handler, message = self.get_handler(content)
+        try:
+            with count_queries(f"{self.__class__.__name__}.{event_type}"):
+                await handler(message)
+        except Exception as e:
+            print(e)
+
+    async def default_handler(self, message):
+        print(f"Unknown event type received: {message}")
+
+    async def self_dispatch(self, event):
+        try:
+            await self.channel_layer.group_send(await self.get_channel_group_name(), self.get_self_dispatch_event(event))
+        except Exception as e:
+            print(e)
+
+    async def updatePageBody(self):
+        def build():
+            templates, context = [], {}
+            context.update(**self.context_builder.get_full_context())
+            templates.append(self.body_template)
+            return templates, context
+
+        await self.response_builder(build, version_token=self.start_view_version(await self.get_channel_group_name()))
+
+    async def resyncPageBody(self):
+        resync = self.get_resync_parts(await self.get_channel_group_name())
+        if resync is None:
+            return False
+        await self.send_parts(*resync)
+        return True
+
+    async def response_builder(self, build, version_token=None):
+        """
+        Run ``build`` and render its templates in one worker thread, then send the parts.
+
+        ``build`` is a sync callable returning ``(templates, context)``; it may touch the ORM.
+        """
+
+        def render():
+            templates, context = build()
+            return templates_builder(context, templates)
+
+        await self.send_parts(await database_sync_to_async(render)(), version_token)
+
+    async def send_parts(self, parts, version_token=None):
+        for part in self.mark_parts(parts, version_token):
+            await self.send(text_data=part)
+
+    async def broadcast(self, channel_group_name, message_type, build, variants=None, **extra):
+        """
+        Async counterpart of ``BaseConsumer.broadcast``, ``build`` returns ``(templates, context)``
+        and every variant is rendered in the same worker thread.
+        """
+
+        def render():
+            templates, context = build()
+            return self.render_variants(templates, context, variants)
+
+        rendered = await database_sync_to_async(render)()
+        try:
+            await self.channel_layer.group_send(channel_group_name, self.get_broadcast_event(channel_group_name, message_type, rendered, **extra))
+        except Exception as e:
+            print(e)
+
+    async def forwardRendered(self, event):
+        forward = self.get_forward_parts(event[self.message], await self.get_channel_group_name())
+        if forward is not None:
+            await self.send_parts(*forward)
+
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        self.record_traffic(text_data)
+        await super().send(text_data=text_data, bytes_data=bytes_data, close=close)
+
+    async def heartbeat(self, event):
+        await database_sync_to_async(get_presence_backend().touch)(self.get_channel_name())
+
+
+class AsyncGroupConsumerMixin:
+    order_group = None
+
+    async def get_order_group(self):
+        # * cached for the connection, orderApp.signals resets it when the group changes
+        if self.order_group is None:
+            self.order_group = await OrderGroup.objects.aget(group_number=self.scope["url_route"]["kwargs"]["group_name"])
+        return self.order_group
+
+    async def resetOrderObjects(self, event):
+        # * sent by orderApp.signals when the room or group of this connection is saved or deleted
+        self.order_group = None
+        self.context_builder = None
+        await self.get_context_builder()
+
+
+class AsyncOrderSelectionConsumer(AsyncGroupConsumerMixin, AsyncBaseConsumer):
+    channel_group_name = ORDER_SELECTION_CHANNEL_GROUP
+    resync = True
+    view = CV.ORDER_SELECTION
+    body_template = "orderSelection/body.html"
+    context_class = OrderSelectionContext
+    order_room = None
+
+    async def get_channel_group_name(self):
+        return f"{self.channel_group_name}{(await self.get_order_room()).pk}"
+
+    async def after_connect(self):
+        await summary_cache.asubscribe((await self.get_order_room()).pk)
+        await self.updateUsersConnectedCount()
+        await super().after_connect()
+
+    async def get_context_builder_kwargs(self):
+        kwargs = await super().get_context_builder_kwargs()
+        kwargs.update({"order_group": await self.get_order_group(), "order_room": await self.get_order_room()})
+        return kwargs
+
+    async def get_order_room(self):
+        if self.order_room is None:
+            self.order_room = await OrderRoom.objects.aget(room_number=self.scope["url_route"]["kwargs"]["room_name"])
+        return self.order_room
+
+    async def resetOrderObjects(self, event):
+        self.order_room = None
+        await super().resetOrderObjects(event)
+
+    async def after_disconnect(self):
+        await super().after_disconnect()
+        await summary_cache.aunsubscribe((await self.get_order_room()).pk)
+        await self.updateUsersConnectedCount()
+
+    async def addOrderItem(self, event):
+        # TODO check order id is belong to this user and last order in room
+        state = await aget_order(user=self.get_user(), order_room=await self.get_order_room())
+
+        def build():
+            templates, context = [], {}
+
+            # TODO improve error msgs handling
+            if state.get("disabled") and state["reason"] == "time_out":
+                context.update(EM.TIME_UP)
+                templates.append("orderSelection/bottomSection/error_time_expired.html")
+            elif state.get("disabled") and state["reason"] == "order_limit":
+                context.update(EM.CREATE_ORDER)
+
+            if state.get("created", False):
+                event[self.message].update({"fk_order": state.get("order")})
+                if not event[self.message].get("fk_order"):
+                    raise ValueError("fk_order")
+                form = OrderItemForm(event[self.message])
+                if form.is_valid():
+                    instance = form.save(True)
+                    form = OrderItemForm(initial={**form.cleaned_data, "fk_menu_item": None, "quantity": None})
+                    context.update({"form": form})
+                    context.update({"remove_errors": True})
+
+                    context.update(**self.context_builder.get_details_context(instance=instance))
+                    templates.append("orderSelection/bodySection/detailsSectionBodyTable.html")
+                    context.update({"swap_method": "afterbegin"})
+
+                else:
+                    context.update({"form": form})
+
+            templates.append("orderSelection/bottomSection/form/formOrderItem.html")
+            context.update(**self.context_builder.get_form_context(restaurant_instance=event[self.message].get("fk_restaurant")))
+            return templates, context
+
+        await self.response_builder(build)
+
+    async def finishOrder(self, event):
+        order_room = await self.get_order_room()
+        order = await aget_last_order(user=self.get_user(), order_room=order_room)
+        if order:
+            event[self.message].update({"fk_order": order.pk})
+
+        state = await acreate_order_checks(user=self.get_user(), order_room=order_room)
+        time_out = state.get("disabled") and state["reason"] == "time_out"
+        finished_state = {} if time_out else await afinish_order(event[self.message].get("fk_order"))
+
+        def build():
+            templates, context = [], {}
+            if time_out:
+                context.update(EM.TIME_UP)
+                templates.append("orderSelection/bottomSection/error_time_expired.html")
+                return templates, context
+
+            if finished_state["finished"]:
+                context.update({"remove_errors": True})
+
+                context.update(**self.context_builder.get_form_context())
+                templates.append("orderSelection/bottomSection/form/formOrderItem.html")
+
+                context.update(**self.context_builder.get_details_context())
+                templates.append("base/bodySection/detailsSection.html")
+            else:
+                context.update(EM.FINISH_ORDER)
+
+            templates.append("orderSelection/bottomSection/actions/finishOrder.html")
+            return templates, context
+
+        # * like OrderSelectionConsumer, the room sees the finished order before the sender's own response
+        if finished_state.get("finished"):
+            await self.membersOrders(order)
+
+        await self.response_builder(build)
+
+    async def membersOrders(self, order):
+        def build():
+            return ["orderSelection/bodySection/listSectionBodyTable.html"], self.context_builder.get_list_context(instance=order)
+
+        await self.broadcast(await self.get_channel_group_name(), "membersOrders", build)
+
+    async def OrdersList(self, event):
+        all_orders = bool(event[self.message].get("all_orders"))
+        order_room = await self.get_order_room()
+
+        def build():
+            templates, context = [], {}
+            if all_orders:
+                context.update(**self.context_builder.get_list_context(all_orders=all_orders))
+                context.update(**self.context_builder.get_extra_context(all_orders=all_orders))
+            else:
+                order = get_user_order(user=self.get_user(), order_room=order_room, finished=True)
+                context.update(**self.context_builder.get_list_context(instance=order, all_orders=all_orders))
+                context.update(**self.context_builder.get_extra_context(all_orders=all_orders))
+
+            templates.append("base/bodySection/listSectionBody.html")
+            templates.append("orderSelection/bottomSection/actions/getOrderList.html")
+            return templates, context
+
+        await self.response_builder(build)
+
+    async def deleteOrderItem(self, event):
+        orderItemObj = await OrderItem.objects.select_related("fk_order").aget(pk=event[self.message].get("item_id"))
+
+        if orderItemObj.fk_order.fk_user_id != self.get_user().pk:
+            return
+        # TODO validation for delete is on right order and can delete [finished orders]
+        await orderItemObj.adelete()
+
+        def build():
+            return ["orderSelection/bodySection/row_remove.html"], {"item_id": event[self.message].get("item_id")}
+
+        await self.response_builder(build)
+
+    async def showMemberItemOrders(self, event):
+        def build():
+            templates, context = [], {}
+            context.update({**self.context_builder.get_details_context(order_instance=event[self.message].get("item_id"), disable_remove_button=True)})
+            templates.append("orderSelection/bodySection/order_items_modal.html")
+            return templates, context
+
+        await self.response_builder(build)
+
+    async def groupOrderSummary(self, event):
+        def build():
+            templates, context = [], {}
+            summary = self.context_builder.get_group_order_summary()
+            if summary is None:
+                templates.append("orderSelection/bottomSection/actions/orderSummary.html")
+                context.update(EM.ORDER_SUMMARY)
+            else:
+                context.update(**summary)
+                templates.append("orderSelection/bottomSection/actions/summaryTables.html")
+            return templates, context
+
+        await self.response_builder(build)
+
+    async def updateUsersConnectedCount(self):
+        # * connects/disconnects of a room are coalesced, the count is rendered once the window closes
+        order_room = await self.get_order_room()
+
+        def build():
+            OrderRoom.load_connected_users([order_room])
+            return ["orderRoom/bodySection/connectedUsers.html"], {"item": order_room}
+
+        channel_group_name = f"{ORDER_ROOM_CHANNEL_GROUP}{(await self.get_order_group()).group_number}"
+        await connected_users_coalescer.schedule(order_room.pk, lambda: self.broadcast(channel_group_name, "updateConnectedUsers", build))
@@ -0,0 +1,102 @@
+import threading
+import uuid
+from collections import Counter, deque
+
+from django.conf import settings
+from django.utils.html import format_html
+
+
+class ChangeLog:
+    """
+    Last broadcasts of one view (channel group) seen by this process, numbered in arrival order.
+
+    Versions are ``"<epoch>:<n>"``, the epoch changes whenever the log is recreated
+    so a version from another process or an older log never matches.
+    """
+
+    def __init__(self, size):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.size = size
+        self.version = 0
+        self.entries = deque()
+        self.ids = {}
+
+    def token(self, version=None):
+        return f"{self.epoch}:{self.version if version is None else version}"
+
+    def record(self, message):
+        # * every local subscriber of the group receives the same broadcast, only the first one adds it
+        version = self.ids.get(message["message_id"])
+        if version is None:
+            self.version += 1
+            version = self.version
+            self.entries.append((version, message))
+            self.ids[message["message_id"]] = version
+            if len(self.entries) > self.size:
+                _, dropped = self.entries.popleft()
+                del self.ids[dropped["message_id"]]
+        return version
+
+    def since(self, token):
+        """Entries after ``token``, or None when the log can't cover the gap."""
+        epoch, _, version = token.partition(":")
+        if epoch != self.epoch or not version.isdigit() or int(version) > self.version:
+            return None
+        version = int(version)
+        oldest = self.entries[0][0] if self.entries else self.version + 1
+        if version < oldest - 1:
+            return None
+        return [entry for entry in self.entries if entry[0] > version]
+
+
+class ChangeLogRegistry:
+    """Change logs per view, kept only while the view has subscribers in this process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.logs = {}
+        self.subscribers = Counter()
+
+    def subscribe(self, key):
+        with self.lock:
+            self.subscribers[key] += 1
+            if key not in self.logs:
+                self.logs[key] = ChangeLog(settings.CHANGE_LOG_SIZE)
+
+    def unsubscribe(self, key):
+        # ! nobody here receives the group anymore so later broadcasts would be missing from the log
+        with self.lock:
+            self.subscribers[key] -= 1
+            if self.subscribers[key] <= 0:
+                del self.subscribers[key]
+                self.logs.pop(key, None)
+
+    def record(self, key, message):
+        """``(version, token)`` of a received broadcast, ``(None, None)`` when the view has no log."""
+        with self.lock:
+            log = self.logs.get(key)
+            if log is None:
+                return None, None
+            version = log.record(message)
+            return version, log.token(version)
+
+    def since(self, key, token):
+        """``(entries, version, token)`` to bring a client at ``token`` up to date, entries are None when it can't."""
+        with self.lock:
+            log = self.logs.get(key)
+            if log is None:
+                return None, None, None
+            return log.since(token), log.version, log.token()
+
+    def current(self, key):
+        with self.lock:
+            log = self.logs.get(key)
+            return (log.version, log.token()) if log else (None, None)
+
+
+def version_marker(token):
+    # * swapped into #ws_version, assets/js/ws_version.js sends it back when the socket reconnects
+    return format_html('<div id="ws_version" data-version="{}" hx-swap-oob="true" hidden></div>', token)
+
+
+change_logs = ChangeLogRegistry()
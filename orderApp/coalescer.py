@@ -0,0 +1,72 @@
+import asyncio
+import contextvars
+import time
+
+from django.conf import settings
+
+
+class UpdateCoalescer:
+    """
+    Collapse bursts of updates for the same key into a single callback.
+
+    The first ``schedule`` for a key starts a ``window`` seconds timer, later calls inside
+    the window replace the pending callback, so only the last one runs when the timer fires.
+    Must be used from the event loop (``async_to_sync`` from sync consumers).
+    With settings.WS_TRAFFIC_STATS the counters are printed next to the traffic totals,
+    every settings.WS_TRAFFIC_REPORT_INTERVAL seconds.
+    """
+
+    def __init__(self, name, window):
+        self.name = name
+        self.window = window
+        self.pending = {}
+        self.tasks = set()
+        self.stats = {"scheduled": 0, "sent": 0, "collapsed": 0}
+        self.reported_at = time.monotonic()
+
+    async def schedule(self, key, callback):
+        self.stats["scheduled"] += 1
+        if key in self.pending:
+            self.stats["collapsed"] += 1
+            self.pending[key] = callback
+            return
+        self.pending[key] = callback
+        if not self.window:
+            await self.flush(key)
+            return
+        # * fresh context so the flush doesn't hop back into the (finished) caller's sync thread
+        asyncio.get_running_loop().call_later(self.window, self.start_flush, key, context=contextvars.Context())
+
+    def start_flush(self, key):
+        task = asyncio.ensure_future(self.flush(key))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def flush(self, key):
+        callback = self.pending.pop(key, None)
+        if callback is None:
+            return
+        self.stats["sent"] += 1
+        try:
+            await callback()
+        except Exception as e:
+            print(e)
+        if settings.WS_TRAFFIC_STATS:
+            self.maybe_report()
+
+    def maybe_report(self):
+        now = time.monotonic()
+        if now - self.reported_at < settings.WS_TRAFFIC_REPORT_INTERVAL:
+            return
+        self.reported_at = now
+        self.print_report()
+
+    def print_report(self):
+        report = self.report()
+        print(f"[WS-COALESCE] {self.name}: {report['scheduled']} scheduled, {report['sent']} sent, {report['collapsed']} collapsed")
+
+    def report(self):
+        return dict(self.stats)
+
+
+connected_users_coalescer = UpdateCoalescer("updateConnectedUsers", window=settings.CONNECTED_USERS_UPDATE_WINDOW)
@@ -1,22 +1,31 @@
-from functools import wraps
+import uuid
+from urllib.parse import parse_qs
 
 from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
 from channels.generic.websocket import JsonWebsocketConsumer
-from channels_presence.models import Presence, Room
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 from invitations.utils import get_invitation_model
 
+from core.sql_tracker import count_queries
 from invitation.forms import CustomInviteForm
+from orderApp.changeLog import change_logs, version_marker
+from orderApp.coalescer import connected_users_coalescer
 from orderApp.enums import (
-    ORDER_GROUP_CHANNEL_GROUP,
+    BROADCAST_VARIANT,
+    ORDER_GROUP_MEMBERS_CHANNEL_GROUP,
+    ORDER_GROUP_USER_CHANNEL_GROUP,
     ORDER_ROOM_CHANNEL_GROUP,
     ORDER_SELECTION_CHANNEL_GROUP,
     RESTAURANT_ROOM_CHANNEL_GROUP,
 )
 from orderApp.enums import CurrentViews as CV
 from orderApp.enums import ErrorMessage as EM
+from orderApp.enums import ViewContextKeys as VC
 from orderApp.forms import (
     MenuItemForm,
     OrderGroupForm,
@@ -35,23 +44,23 @@ from orderApp.orderSelectionContext import (
     get_order,
     get_user_order,
 )
+from orderApp.presence import get_presence_backend
 from orderApp.restaurantContext import RestaurantContext
+from orderApp.summaryCache import summary_cache
+from orderApp.traffic import ws_traffic
 from orderApp.utils import templates_builder
 
 UserModel = get_user_model()
 
 
-def group_message(fn):
-    @wraps(fn)
-    def wrapper(self, event, *args, **kwargs):
-        if event.get("group", True):
-            return self.self_dispatch(event)
-        return fn(self, event, *args, **kwargs)
+class BaseConsumerMixin:
+    """
+    State and message logic shared by ``BaseConsumer`` and ``AsyncBaseConsumer``.
 
-    return wrapper
+    Nothing here touches the channel layer, the socket or the database, the two
+    consumers only wrap these methods with their sync or async I/O.
+    """
 
-
-class BaseConsumer(JsonWebsocketConsumer):
     message_type = "message_type"
     message = "message"
     channel_group_name = None
@@ -61,48 +70,140 @@ class BaseConsumer(JsonWebsocketConsumer):
     body_template = None
     context_class = None
     context_builder = None
+    message_label = None
+    deflate = None
+    # * views whose broadcasts all go to their own channel group can replay missed ones on reconnect
+    resync = False
+    view_version = 0
 
     def get_user(self):
         if self.user is None:
             self.user = self.scope["user"]
         return self.user
 
+    def get_channel_name(self):
+        if self.channel_name is None:
+            raise NotImplementedError("Subclasses must define channel_name or implement get_channel_name()")
+        return self.channel_name
+
+    def get_context_class(self):
+        if self.context_class is None:
+            raise NotImplementedError("Subclasses must define context_class or implement get_context_class()")
+        return self.context_class
+
+    def get_handler(self, content):
+        event_type = content.get(self.message_type, "")
+        self.message_label = event_type
+        return event_type, getattr(self, event_type, self.default_handler), dict(message=content)
+
+    def get_self_dispatch_event(self, event):
+        return {"type": event[self.message][self.message_type], self.message: event[self.message], "group": False}
+
+    def start_view_version(self, channel_group_name):
+        """Version token of the page body about to be rendered, the client resyncs from it on reconnect."""
+        self.message_label = "updatePageBody"
+        version, token = change_logs.current(channel_group_name) if self.resync else (None, None)
+        self.view_version = version or 0
+        return token
+
+    def get_resync_parts(self, channel_group_name):
+        """
+        Parts of the broadcasts a reconnecting client missed since the version it sent and the
+        latest version token, None when the change log can't cover the gap and the body must be rendered.
+        """
+        token = parse_qs(self.scope.get("query_string", b"").decode()).get("version", [None])[0]
+        if not self.resync or not token:
+            return None
+        entries, version, latest_token = change_logs.since(channel_group_name, token)
+        if entries is None:
+            return None
+        self.message_label = "resyncPageBody"
+        self.view_version = version
+        return [part for _, message in entries for part in message["variants"].get(self.get_broadcast_variant(message), [])], latest_token
+
+    def mark_parts(self, parts, version_token=None):
+        # * the version marker rides in the last frame so the client never holds a version newer than its html
+        parts = list(parts)
+        if version_token:
+            marker = version_marker(version_token)
+            parts = parts[:-1] + [parts[-1] + marker] if parts else [marker]
+        return parts
+
+    def render_variants(self, templates, context, variants=None):
+        """
+        Render ``templates`` once per variant, ``variants`` maps a variant name to the context
+        overrides used to render it, receivers pick theirs in ``get_broadcast_variant``.
+        """
+        variants = variants or {BROADCAST_VARIANT: {}}
+        return {variant: templates_builder({**context, **overrides}, templates) for variant, overrides in variants.items()}
+
+    def get_broadcast_event(self, channel_group_name, message_type, rendered, **extra):
+        return {
+            "type": "forwardRendered",
+            self.message: {
+                self.message_type: message_type,
+                "variants": rendered,
+                "message_id": uuid.uuid4().hex,
+                "channel_group_name": channel_group_name,
+                **extra,
+            },
+        }
+
+    def get_forward_parts(self, message, channel_group_name):
+        """Parts and version token of a ``forwardRendered`` message for this socket, None when already sent."""
+        self.message_label = message[self.message_type]
+        token = None
+        if self.resync and message["channel_group_name"] == channel_group_name:
+            version, token = change_logs.record(message["channel_group_name"], message)
+            if version is not None:
+                if version <= self.view_version:
+                    # * already replayed by resyncPageBody
+                    return None
+                self.view_version = version
+        return message["variants"].get(self.get_broadcast_variant(message), []), token
+
+    def get_broadcast_variant(self, message):
+        return BROADCAST_VARIANT
+
+    def record_traffic(self, text_data):
+        if settings.WS_TRAFFIC_STATS and text_data:
+            if self.deflate is None:
+                self.deflate = ws_traffic.compressor()
+            ws_traffic.record(self.message_label, text_data, self.deflate)
+
+
+class BaseConsumer(BaseConsumerMixin, JsonWebsocketConsumer):
     def connect(self):
         self.get_user()
-        # ! used django-channels-presence for handle connect/disconnect properly
+        # ! presence backend (settings.PRESENCE_BACKEND) joins/leaves the channel group and tracks connected users
         # async_to_sync(self.channel_layer.group_add)(self.get_channel_group_name(), self.get_channel_name())
-        Room.objects.add(self.get_channel_group_name(), self.get_channel_name(), self.scope["user"])
+        get_presence_backend().add(self.get_channel_group_name(), self.get_channel_name(), self.scope["user"])
+        if self.resync:
+            change_logs.subscribe(self.get_channel_group_name())
         self.accept()
         self.after_connect()
 
     def after_connect(self):
         self.get_context_builder()
-        self.updatePageBody()
+        if not self.resyncPageBody():
+            self.updatePageBody()
 
     def after_disconnect(self):
         pass
 
     def disconnect(self, close_code):
-        # ! used django-channels-presence for handle connect/disconnect properly
+        # ! presence backend (settings.PRESENCE_BACKEND) joins/leaves the channel group and tracks connected users
         # async_to_sync(self.channel_layer.group_discard)(self.get_channel_group_name(), self.get_channel_name())
-        Room.objects.remove(self.get_channel_group_name(), self.get_channel_name())
+        get_presence_backend().remove(self.get_channel_group_name(), self.get_channel_name())
+        if self.resync:
+            change_logs.unsubscribe(self.get_channel_group_name())
         self.after_disconnect()
 
-    def get_channel_name(self):
-        if self.channel_name is None:
-            raise NotImplementedError("Subclasses must define channel_name or implement get_channel_name()")
-        return self.channel_name
-
     def get_channel_group_name(self):
         if self.channel_group_name is None:
             raise NotImplementedError("Subclasses must define channel_group_name or implement get_channel_group_name()")
         return self.channel_group_name
 
-    def get_context_class(self):
-        if self.context_class is None:
-            raise NotImplementedError("Subclasses must define context_class or implement get_context_class()")
-        return self.context_class
-
     def get_context_builder(self):
         if self.context_builder is None:
             self.context_builder = self.get_context_class()(**self.get_context_builder_kwargs())
@@ -112,11 +213,10 @@ class BaseConsumer(JsonWebsocketConsumer):
         return {"user": self.get_user()}
 
     def receive_json(self, content, **kwargs):
-        event_type = content.get(self.message_type, "")
-        message = dict(message=content)
-        handler = getattr(self, event_type, self.default_handler)
+        event_type, handler, message = self.get_handler(content)
         try:
-            handler(message)
+            with count_queries(f"{self.__class__.__name__}.{event_type}"):
+                handler(message)
         except Exception as e:
             print(e)
 
@@ -130,7 +230,7 @@ class BaseConsumer(JsonWebsocketConsumer):
         # ! from outside consumers
         # ?{"type": "sendNotification", "message": {"message_type": "sendNotification"}}
         try:
-            async_to_sync(self.channel_layer.group_send)(self.get_channel_group_name(), {"type": event[self.message][self.message_type], self.message: event[self.message], "group": False})
+            async_to_sync(self.channel_layer.group_send)(self.get_channel_group_name(), self.get_self_dispatch_event(event))
         except Exception as e:
             print(e)
 
@@ -139,28 +239,128 @@ class BaseConsumer(JsonWebsocketConsumer):
         # TODO fix this as we build context already in build context
         context.update(**self.get_context_builder().get_full_context())
         templates.append(self.body_template)
-        self.response_builder(templates, context)
+        self.response_builder(templates, context, version_token=self.start_view_version(self.get_channel_group_name()))
+
+    def resyncPageBody(self):
+        """Replay the broadcasts a reconnecting client missed, returns False when the body must be rendered."""
+        resync = self.get_resync_parts(self.get_channel_group_name())
+        if resync is None:
+            return False
+        self.send_parts(*resync)
+        return True
+
+    def response_builder(self, templates, context, version_token=None):
+        self.send_parts(templates_builder(context, templates), version_token)
 
-    def response_builder(self, templates, context):
-        response = templates_builder(context, templates)
-        for part in response:
+    def send_parts(self, parts, version_token=None):
+        for part in self.mark_parts(parts, version_token):
             self.send(text_data=part)
 
+    def broadcast(self, channel_group_name, message_type, templates, context, variants=None, **extra):
+        """Render ``templates`` once per variant and send the finished html to ``channel_group_name``."""
+        rendered = self.render_variants(templates, context, variants)
+        try:
+            async_to_sync(self.channel_layer.group_send)(channel_group_name, self.get_broadcast_event(channel_group_name, message_type, rendered, **extra))
+        except Exception as e:
+            print(e)
+
+    def forwardRendered(self, event):
+        forward = self.get_forward_parts(event[self.message], self.get_channel_group_name())
+        if forward is not None:
+            self.send_parts(*forward)
+
+    def send(self, text_data=None, bytes_data=None, close=False):
+        self.record_traffic(text_data)
+        super().send(text_data=text_data, bytes_data=bytes_data, close=close)
+
     def heartbeat(self, event):
-        Presence.objects.touch(self.get_channel_name())
+        get_presence_backend().touch(self.get_channel_name())
 
 
 class OrderGroupConsumer(BaseConsumer):
-    channel_group_name = ORDER_GROUP_CHANNEL_GROUP
+    channel_group_name = ORDER_GROUP_USER_CHANNEL_GROUP
+    members_channel_group_name = ORDER_GROUP_MEMBERS_CHANNEL_GROUP
     view = CV.ORDER_GROUP
     body_template = "common/body.html"
     context_class = OrderGroupContext
+    members_channel_groups = None
 
-    @group_message
-    def sendUpdateGroupsList(self, event):
-        self.updateGroupsListBuilder(event)
+    def get_channel_group_name(self):
+        return f"{self.channel_group_name}{self.get_user().pk}"
+
+    def get_members_channel_group_name(self, group_number):
+        return f"{self.members_channel_group_name}{group_number}"
+
+    def after_connect(self):
+        self.members_channel_groups = set()
+        for group_number in OrderGroup.get_user_order_groups(self.get_user()).values_list("group_number", flat=True):
+            self.subscribe_order_group(group_number)
+        super().after_connect()
+
+    def after_disconnect(self):
+        super().after_disconnect()
+        for channel_group_name in self.members_channel_groups or ():
+            async_to_sync(self.channel_layer.group_discard)(channel_group_name, self.get_channel_name())
+        self.members_channel_groups = set()
+
+    def subscribe_order_group(self, group_number):
+        channel_group_name = self.get_members_channel_group_name(group_number)
+        if channel_group_name not in self.members_channel_groups:
+            async_to_sync(self.channel_layer.group_add)(channel_group_name, self.get_channel_name())
+            self.members_channel_groups.add(channel_group_name)
+
+    def unsubscribe_order_group(self, group_number):
+        channel_group_name = self.get_members_channel_group_name(group_number)
+        if channel_group_name in self.members_channel_groups:
+            async_to_sync(self.channel_layer.group_discard)(channel_group_name, self.get_channel_name())
+            self.members_channel_groups.discard(channel_group_name)
+
+    def syncOrderGroupSubscription(self, event):
+        # * sent by orderApp.signals when the user joins or leaves an order group
+        order_group = OrderGroup.objects.filter(group_number=event[self.message].get("group_number")).first()
+        if order_group and order_group.can_join_group(self.get_user()):
+            self.subscribe_order_group(order_group.group_number)
+        else:
+            self.unsubscribe_order_group(event[self.message].get("group_number"))
+
+    def sendUpdateGroupsList(self, event, channel_group_name=None):
+        instance = event[self.message].get("instance")
+        if not instance:
+            # * full list depends on the receiver so every consumer renders its own
+            self.self_dispatch({self.message: {**event[self.message], self.message_type: "updateGroupsList"}})
+            return
+        context = {**self.get_context_builder().get_list_context(instance=instance), "swap_method": "afterbegin"}
+        variants, roles = self.get_group_role_variants(instance)
+        channel_group_name = channel_group_name or self.get_members_channel_group_name(instance.group_number)
+        self.broadcast(channel_group_name, "sendUpdateGroupsList", ["orderGroup/bodySection/listSectionBodyTable.html"], context, variants=variants, **roles)
+
+    def get_group_role_variants(self, order_group):
+        """
+        Group rows only differ between the owner, members and everyone else,
+        so render one variant per role with a representative user.
+        """
+        member_ids = list(order_group.m2m_users.values_list("pk", flat=True))
+        owner_group_ids = {order_group.pk} if order_group.fk_owner_id in member_ids else set()
+        variants = {
+            "owner": {VC.USER: order_group.fk_owner, VC.LIST_MEMBER_GROUP_IDS: owner_group_ids},
+            "guest": {VC.USER: AnonymousUser(), VC.LIST_MEMBER_GROUP_IDS: set()},
+        }
+        member = order_group.m2m_users.exclude(pk=order_group.fk_owner_id).first()
+        if member:
+            variants["member"] = {VC.USER: member, VC.LIST_MEMBER_GROUP_IDS: {order_group.pk}}
+        return variants, {"owner_id": order_group.fk_owner_id, "member_ids": member_ids}
+
+    def get_broadcast_variant(self, message):
+        if "owner_id" not in message:
+            return super().get_broadcast_variant(message)
+        if self.get_user().pk == message["owner_id"]:
+            return "owner"
+        if self.get_user().pk in message["member_ids"]:
+            return "member"
+        return "guest"
 
     def updateGroupsList(self, event):
+        self.message_label = "updateGroupsList"
         self.updateGroupsListBuilder(event)
 
     def updateGroupsListBuilder(self, event):
@@ -194,7 +394,9 @@ class OrderGroupConsumer(BaseConsumer):
         if form.is_valid():
             instance = form.save(True)
             instance.add_user_to_group(user=self.get_user())
-            self.sendUpdateGroupsList({"message": {"message_type": "sendUpdateGroupsList", "instance": instance}})
+            self.subscribe_order_group(instance.group_number)
+            # * a new group only has its owner, so the owner's own sockets are the audience
+            self.sendUpdateGroupsList({"message": {"message_type": "sendUpdateGroupsList", "instance": instance}}, channel_group_name=self.get_channel_group_name())
         else:
             context.update({"form": form})
         templates.append("orderGroup/bottomSection/form/formGroupItem.html")
@@ -244,7 +446,8 @@ class OrderGroupConsumer(BaseConsumer):
                 context.update({"url": reverse("order_room", args=[order_group.group_number])})
                 templates.append("base/helpers/redirector.html")
                 order_group.add_user_to_group(self.get_user())
-                self.updateConnectedUsers({"message": {"message_type": "updateConnectedUsers", "instance": order_group}})
+                self.subscribe_order_group(order_group.group_number)
+                self.updateConnectedUsers(order_group)
             else:
                 retry_instance.failed_retry()
                 if retry_instance.can_retry():
@@ -260,12 +463,8 @@ class OrderGroupConsumer(BaseConsumer):
         context.update({"join_form_error": _(error_msg)})
         templates.append(template)
 
-    @group_message
-    def updateConnectedUsers(self, event):
-        templates, context = [], {}
-        context.update({"item": event[self.message]["instance"]})
-        templates.append("orderGroup/bodySection/connectedUsers.html")
-        self.response_builder(templates, context)
+    def updateConnectedUsers(self, order_group):
+        self.broadcast(self.get_members_channel_group_name(order_group.group_number), "updateConnectedUsers", ["orderGroup/bodySection/connectedUsers.html"], {"item": order_group})
 
     def sendInvite(self, event):
         templates, context = [], {}
@@ -299,24 +498,34 @@ class OrderGroupConsumer(BaseConsumer):
 
 
 class GroupConsumerMixin:
+    order_group = None
+
     def get_order_group(self):
-        # TODO user has attr for check instead of None
-        self.order_group = OrderGroup.objects.get(group_number=self.scope["url_route"]["kwargs"]["group_name"])
+        # * cached for the connection, orderApp.signals resets it when the group changes
+        if self.order_group is None:
+            self.order_group = OrderGroup.objects.get(group_number=self.scope["url_route"]["kwargs"]["group_name"])
         return self.order_group
 
+    def resetOrderObjects(self, event):
+        # * sent by orderApp.signals when the room or group of this connection is saved or deleted
+        self.order_group = None
+        self.context_builder = None
+
 
 class OrderRoomConsumer(GroupConsumerMixin, BaseConsumer):
     channel_group_name = ORDER_ROOM_CHANNEL_GROUP
+    resync = True
     view = CV.ORDER_ROOM
     body_template = "common/body.html"
     context_class = OrderRoomContext
 
-    @group_message
-    def updateRoomsList(self, event):
-        templates, context = [], {}
-        context.update(**self.get_context_builder().get_list_context(instance=event["message"].get("instance")))
-        templates.append("orderRoom/bodySection/listSectionBodyTable.html")
-        self.response_builder(templates, context)
+    def get_channel_group_name(self):
+        # * room lists are scoped per order group so events only reach that team
+        return f"{self.channel_group_name}{self.get_order_group().group_number}"
+
+    def updateRoomsList(self, instance):
+        context = self.get_context_builder().get_list_context(instance=instance)
+        self.broadcast(self.get_channel_group_name(), "updateRoomsList", ["orderRoom/bodySection/listSectionBodyTable.html"], context)
 
     def showRoomMembers(self, event):
         templates, context = [], {}
@@ -332,7 +541,7 @@ class OrderRoomConsumer(GroupConsumerMixin, BaseConsumer):
         form = OrderRoomForm(event[self.message])
         if form.is_valid():
             instance = form.save(True)
-            self.updateRoomsList({"message": {"message_type": "updateRoomsList", "instance": instance}})
+            self.updateRoomsList(instance)
         else:
             context.update({"form": form})
         templates.append("orderRoom/bottomSection/form/formGroupItem.html")
@@ -343,24 +552,21 @@ class OrderRoomConsumer(GroupConsumerMixin, BaseConsumer):
         kwargs.update({"order_group": self.get_order_group()})
         return kwargs
 
-    def updateConnectedUsers(self, event):
-        templates, context = [], {}
-        context.update({"item": event[self.message]["instance"]})
-        templates.append("orderRoom/bodySection/connectedUsers.html")
-        self.response_builder(templates, context)
-
 
 class OrderSelectionConsumer(GroupConsumerMixin, BaseConsumer):
     channel_group_name = ORDER_SELECTION_CHANNEL_GROUP
+    resync = True
     view = CV.ORDER_SELECTION
     body_template = "orderSelection/body.html"
     context_class = OrderSelectionContext
+    order_room = None
 
     def get_channel_group_name(self):
         return f"{self.channel_group_name}{self.get_order_room().pk}"
 
     def after_connect(self):
         # self.add_user_to_room()
+        async_to_sync(summary_cache.asubscribe)(self.get_order_room().pk)
         self.updateUsersConnectedCount()
         super().after_connect()
 
@@ -370,10 +576,14 @@ class OrderSelectionConsumer(GroupConsumerMixin, BaseConsumer):
         return kwargs
 
     def get_order_room(self):
-        # TODO use has attr for check instead of None
-        self.order_room = OrderRoom.objects.get(room_number=self.scope["url_route"]["kwargs"]["room_name"])
+        if self.order_room is None:
+            self.order_room = OrderRoom.objects.get(room_number=self.scope["url_route"]["kwargs"]["room_name"])
         return self.order_room
 
+    def resetOrderObjects(self, event):
+        super().resetOrderObjects(event)
+        self.order_room = None
+
     # def add_user_to_room(self):
     #     self.get_order_room().add_user_to_room(self.get_user())
 
@@ -383,6 +593,7 @@ class OrderSelectionConsumer(GroupConsumerMixin, BaseConsumer):
     def after_disconnect(self):
         super().after_disconnect()
         # self.remove_user_from_room()
+        async_to_sync(summary_cache.aunsubscribe)(self.get_order_room().pk)
         self.updateUsersConnectedCount()
 
     def addOrderItem(self, event):
@@ -447,7 +658,7 @@ class OrderSelectionConsumer(GroupConsumerMixin, BaseConsumer):
                 context.update(**self.get_context_builder().get_details_context())
                 templates.append("base/bodySection/detailsSection.html")
 
-                self.membersOrders({"message": {"message_type": "membersOrders", "instance": order}})
+                self.membersOrders(order)
 
             else:
                 context.update(EM.FINISH_ORDER)
@@ -456,12 +667,9 @@ class OrderSelectionConsumer(GroupConsumerMixin, BaseConsumer):
 
         self.response_builder(templates, context)
 
-    @group_message
-    def membersOrders(self, event):
-        templates, context = [], {}
-        context.update(**self.get_context_builder().get_list_context(instance=event["message"].get("instance")))
-        templates.append("orderSelection/bodySection/listSectionBodyTable.html")
-        self.response_builder(templates, context)
+    def membersOrders(self, order):
+        context = self.get_context_builder().get_list_context(instance=order)
+        self.broadcast(self.get_channel_group_name(), "membersOrders", ["orderSelection/bodySection/listSectionBodyTable.html"], context)
 
     def OrdersList(self, event):
         templates, context = [], {}
@@ -510,22 +718,26 @@ class OrderSelectionConsumer(GroupConsumerMixin, BaseConsumer):
     def groupOrderSummary(self, event):
         templates, context = [], {}
 
-        if self.get_context_builder().get_all_orders(order_room=self.get_order_room()).count() == 0:
+        summary = self.get_context_builder().get_group_order_summary()
+        if summary is None:
             templates.append("orderSelection/bottomSection/actions/orderSummary.html")
             context.update(EM.ORDER_SUMMARY)
         else:
-            context.update(**self.get_context_builder().groupOrderSummary())
+            context.update(**summary)
             templates.append("orderSelection/bottomSection/actions/summaryTables.html")
         self.response_builder(templates, context)
 
     def updateUsersConnectedCount(self):
-        async_to_sync(self.channel_layer.group_send)(
-            ORDER_ROOM_CHANNEL_GROUP,
-            {
-                "type": "updateConnectedUsers",
-                "message": {"message_type": "updateConnectedUsers", "instance": self.get_order_room()},
-            },
-        )
+        # * connects/disconnects of a room are coalesced, the count is rendered once the window closes
+        order_room = self.get_order_room()
+        channel_group_name = f"{ORDER_ROOM_CHANNEL_GROUP}{self.get_order_group().group_number}"
+
+        def send_count():
+            # * counted when the window closes, not when the connect was scheduled
+            OrderRoom.load_connected_users([order_room])
+            self.broadcast(channel_group_name, "updateConnectedUsers", ["orderRoom/bodySection/connectedUsers.html"], {"item": order_room})
+
+        async_to_sync(connected_users_coalescer.schedule)(order_room.pk, database_sync_to_async(send_count))
 
 
 class RestaurantConsumer(BaseConsumer):
@@ -1,3 +1,8 @@
+import functools
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.utils.translation import gettext_lazy as _
 
@@ -5,6 +10,7 @@ from orderApp.commonContext import NAVIGATION_BUTTONS
 from orderApp.enums import CurrentViews as CV
 from orderApp.enums import GeneralContextKeys as GC
 from orderApp.enums import ViewContextKeys as VC
+from orderApp.staticContext import static_contexts
 
 UserModel = get_user_model()
 
@@ -23,8 +29,70 @@ def get_current_view(view):
             raise NotImplementedError(f"Unknown view: {view}")
 
 
+class ContextTimings:
+    """Time spent per context section builder and lazy value (settings.TIME_CONTEXT_SECTIONS)."""
+
+    def __init__(self):
+        self.stats = defaultdict(Counter)
+
+    def record(self, label, elapsed):
+        entry = self.stats[label]
+        entry["calls"] += 1
+        entry["ms"] += elapsed * 1000
+        print(f"[CONTEXT-TIME] {label}: {elapsed * 1000:.2f} ms (total {entry['calls']} calls, {entry['ms']:.2f} ms)")
+
+    def timed(self, label, function, *args, **kwargs):
+        if not settings.TIME_CONTEXT_SECTIONS:
+            return function(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self.record(label, time.perf_counter() - start)
+
+
+context_timings = ContextTimings()
+
+
+class LazyContextValue:
+    """
+    Context value computed the first time a template reads it, then kept for the other reads.
+
+    Django templates call callables while resolving variables, so ``{{ value }}``, ``{% if value %}``
+    and ``{% for item in value %}`` all get the computed value and branches that skip it cost nothing.
+    """
+
+    def __init__(self, label, function, *args, **kwargs):
+        self.label = label
+        self.function = functools.partial(function, *args, **kwargs)
+        self.computed = False
+        self.value = None
+
+    def __call__(self):
+        if not self.computed:
+            self.value = context_timings.timed(self.label, self.function)
+            self.computed = True
+        return self.value
+
+
+def timed_section(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return context_timings.timed(f"{self.__class__.__name__}.{method.__name__}", method, self, *args, **kwargs)
+
+    return wrapper
+
+
 class BaseContext:
     view_type = None
+    sections = ["get_base_context", "get_list_context", "get_details_context", "get_form_context", "get_extra_context"]
+    # * keys that are the same for every user and request, per section, see orderApp.staticContext
+    static_sections = ["base", "list", "details", "form", "extra"]
+    static_context = {
+        "base": {GC.NAVIGATION_BUTTONS: NAVIGATION_BUTTONS},
+        "list": {VC.LIST_SECTION_ID: VC.LIST_SECTION_ID, VC.LIST_TABLE_ID: VC.LIST_TABLE_ID, VC.LIST_TABLE_BODY_ID: VC.LIST_TABLE_BODY_ID},
+        "details": {VC.DETAILS_SECTION_ID: VC.DETAILS_SECTION_ID, VC.DETAILS_TABLE_ID: VC.DETAILS_TABLE_ID, VC.DETAILS_TABLE_BODY_ID: VC.DETAILS_TABLE_BODY_ID},
+    }
     # TODO finish required keys
     base_required_keys = [VC.MAIN_TITLE, VC.TITLE_ACTION]
     list_required_keys = [
@@ -36,10 +104,24 @@ class BaseContext:
     ]
     details_required_keys = [VC.DETAILS_SECTION_ID, VC.DETAILS_SECTION_TITLE, VC.DETAILS_SECTION_DATA]
 
+    def __init_subclass__(cls, **kwargs):
+        # * every section builder a context defines reports its time under settings.TIME_CONTEXT_SECTIONS
+        super().__init_subclass__(**kwargs)
+        for section in cls.sections:
+            if section in cls.__dict__:
+                setattr(cls, section, timed_section(cls.__dict__[section]))
+
     def __init__(self, **kwargs):
         for key, value in kwargs.items():
             setattr(self, key, value)
 
+    def get_static_context(self, section):
+        return static_contexts.get(self.__class__, section)
+
+    def lazy(self, name, function, *args, **kwargs):
+        """Context value left to the template, see LazyContextValue."""
+        return LazyContextValue(f"{self.__class__.__name__}.{name}", function, *args, **kwargs)
+
     def get_user(self):
         if not hasattr(self, "user") or self.user is None:
             raise NotImplementedError("Context must be initialized with a 'user' keyword argument.")
@@ -73,29 +155,19 @@ class BaseContext:
         return {VC.USER: self.get_user(), VC.CURRENT: self.get_view_type()}
 
     def get_base_context(self):
-        return {GC.NAVIGATION_BUTTONS: NAVIGATION_BUTTONS, VC.CURRENT: self.get_view_type()}
+        return {**self.get_static_context("base"), VC.CURRENT: self.get_view_type()}
 
     def get_list_context(self):
-        return {
-            **self._get_common_context(),
-            VC.LIST_SECTION_ID: VC.LIST_SECTION_ID,
-            VC.LIST_TABLE_ID: VC.LIST_TABLE_ID,
-            VC.LIST_TABLE_BODY_ID: VC.LIST_TABLE_BODY_ID,
-        }
+        return {**self.get_static_context("list"), **self._get_common_context()}
 
     def get_details_context(self):
-        return {
-            **self._get_common_context(),
-            VC.DETAILS_SECTION_ID: VC.DETAILS_SECTION_ID,
-            VC.DETAILS_TABLE_ID: VC.DETAILS_TABLE_ID,
-            VC.DETAILS_TABLE_BODY_ID: VC.DETAILS_TABLE_BODY_ID,
-        }
+        return {**self.get_static_context("details"), **self._get_common_context()}
 
     def get_form_context(self):
-        return self._get_common_context()
+        return {**self.get_static_context("form"), **self._get_common_context()}
 
     def get_extra_context(self):
-        return {}
+        return dict(self.get_static_context("extra"))
 
     def validate_keys(self, keys_list, ctx):
         missing_list = [k for k in keys_list if k not in ctx]
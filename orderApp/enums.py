@@ -4,6 +4,9 @@ from django.utils.translation import gettext_lazy as _
 
 ORDER_GROUP_CHANNEL = "orderGroup"
 ORDER_GROUP_CHANNEL_GROUP = f"GROUP_{ORDER_GROUP_CHANNEL}"
+# * index page sockets join a per user group plus one members group per order group they belong to
+ORDER_GROUP_USER_CHANNEL_GROUP = f"{ORDER_GROUP_CHANNEL_GROUP}_user"
+ORDER_GROUP_MEMBERS_CHANNEL_GROUP = f"{ORDER_GROUP_CHANNEL_GROUP}_members"
 
 ORDER_ROOM_CHANNEL = "orderRoom"
 ORDER_ROOM_CHANNEL_GROUP = f"GROUP_{ORDER_ROOM_CHANNEL}"
@@ -14,6 +17,12 @@ ORDER_SELECTION_CHANNEL_GROUP = f"GROUP_{ORDER_SELECTION_CHANNEL}"
 RESTAURANT_ROOM_CHANNEL = "restaurantRoom"
 RESTAURANT_ROOM_CHANNEL_GROUP = f"GROUP_{RESTAURANT_ROOM_CHANNEL}"
 
+# * one channel per process and room, orderApp.summaryCache drops the room's summary on every message
+SUMMARY_CACHE_CHANNEL_GROUP = "GROUP_summaryCache"
+
+# ! variant used by broadcasts that render the same html for every receiver
+BROADCAST_VARIANT = "default"
+
 
 class GeneralContextKeys(EnumMeta):
     GROUP_NUMBER = "group_number"
@@ -56,6 +65,7 @@ class ViewContextKeys(EnumMeta):
     LIST_OPEN_ACTION_MESSAGE_TYPE = "list_open_action_message_type"
     LIST_OPEN_PIN_ACTION_MESSAGE_TYPE = "list_open_pin_action_message_type"
     LIST_INVITE_ACTION_MESSAGE_TYPE = "list_invite_action_message_type"
+    LIST_MEMBER_GROUP_IDS = "list_member_group_ids"
 
     DETAILS_SECTION_TEMPLATE = "details_section_template"
     DETAILS_SECTION_BODY_TEMPLATE = "details_section_body_template"
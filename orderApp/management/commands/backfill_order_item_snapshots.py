@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from orderApp.models import Order, OrderItem
+
+
+class Command(BaseCommand):
+    help = "Copy menu item name, restaurant name and price into order items saved before the snapshot fields existed"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        pending = OrderItem.objects.filter(price__isnull=True, fk_menu_item__isnull=False).select_related("fk_menu_item__fk_restaurant").order_by("pk")
+        updated, last_pk = 0, 0
+        while True:
+            # * keyset batches, every batch is its own transaction so a long backfill doesn't lock the table
+            batch = list(pending.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            for order_item in batch:
+                order_item.snapshot_menu_item()
+            with transaction.atomic():
+                OrderItem.objects.bulk_update(batch, ["item_name", "restaurant_name", "price"])
+                Order.recompute_totals(pk__in={order_item.fk_order_id for order_item in batch})
+            updated += len(batch)
+            last_pk = batch[-1].pk
+            self.stdout.write(f"Backfilled {updated} order items")
+        self.stdout.write(self.style.SUCCESS(f"Backfilled snapshots of {updated} order items"))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from orderApp.models import Order
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized Order.total and Order.items_count from the order items"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--room", help="Only orders of this room number")
+
+    def handle(self, *args, **options):
+        filters = {"fk_order_room__room_number": options["room"]} if options["room"] else {}
+        updated = Order.recompute_totals(**filters)
+        self.stdout.write(self.style.SUCCESS(f"Recomputed totals of {updated} orders"))
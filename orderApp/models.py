@@ -2,19 +2,20 @@ import math
 import time
 from datetime import timedelta
 
-from channels_presence.models import Room
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
-from django.core.exceptions import ObjectDoesNotExist
 from django.core.validators import MinLengthValidator, RegexValidator
 from django.db import models
-from django.db.models import F, Q, Sum
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum, Value
 from django.db.models.constraints import UniqueConstraint
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from configuration.models import configuration, join_retry_limit
 from orderApp.enums import ORDER_SELECTION_CHANNEL_GROUP
-from orderApp.utils import PositiveValueValidator
+from orderApp.presence import get_presence_backend
+from orderApp.utils import PositiveValueValidator, business_day_range
 
 SMALL_NAME_LENGTH = 50
 
@@ -47,6 +48,8 @@ class OrderGroup(models.Model):
     fk_owner = models.ForeignKey(UserModel, on_delete=models.CASCADE, verbose_name=_("Group Owner"))
     group_number = models.CharField(_("Group Number"), max_length=SMALL_NAME_LENGTH, default=generate_group_number)  # ! add default value
     pin = models.CharField(_("PIN"), default="0000", validators=[RegexValidator("^[0-9]+$"), MinLengthValidator(4)], max_length=4, help_text=_("Should only contain numbers"))
+    # * version of the rendered group row (orderApp.rowCache)
+    updated_at = models.DateTimeField(_("Updated at"), auto_now=True)
 
     def __str__(self):
         keys = [self.name, self.get_group_members_count()]
@@ -58,7 +61,10 @@ class OrderGroup(models.Model):
         ]
 
     def get_group_members_count(self):
-        return len(self.m2m_users.all())
+        # * annotated by OrderGroup.get_list_queryset, otherwise counted in the database instead of loading every member
+        if hasattr(self, "members_count"):
+            return self.members_count
+        return self.m2m_users.count()
 
     def add_user_to_group(self, user):
         return self.m2m_users.add(user)
@@ -69,6 +75,20 @@ class OrderGroup(models.Model):
     def can_join_group(self, user):
         return self.__class__.objects.filter(Q(m2m_users=user) | Q(fk_owner=user), pk=self.pk).exists()
 
+    @classmethod
+    def get_user_order_groups(cls, user):
+        return cls.objects.filter(Q(m2m_users=user) | Q(fk_owner=user)).distinct()
+
+    @classmethod
+    def get_list_queryset(cls):
+        return cls.objects.annotate(members_count=Count("m2m_users", distinct=True))
+
+    @classmethod
+    def get_member_group_ids(cls, user):
+        if not user.is_authenticated:
+            return set()
+        return set(cls.objects.filter(m2m_users=user).values_list("pk", flat=True))
+
 
 class GroupRetries(models.Model):
     retry = models.PositiveSmallIntegerField(_("Retry"), default=join_retry_limit)
@@ -119,6 +139,8 @@ class OrderRoom(models.Model):
     room_number = models.CharField(_("Room Number"), max_length=SMALL_NAME_LENGTH, default=generate_group_number)  # ! add default value
     fk_order_group = models.ForeignKey(OrderGroup, verbose_name=_("Group"), on_delete=models.CASCADE)
     created_at = models.DateTimeField(_("Created at"), default=timezone.now)
+    # * version of the rendered room row (orderApp.rowCache)
+    updated_at = models.DateTimeField(_("Updated at"), auto_now=True)
 
     class Meta:
         constraints = [
@@ -130,11 +152,22 @@ class OrderRoom(models.Model):
         return generate_str(keys=keys)
 
     def connected_users(self):
-        try:
-            count = Room.objects.get(channel_name=f"{ORDER_SELECTION_CHANNEL_GROUP}{self.pk}").get_users().count()
-        except ObjectDoesNotExist:
-            count = 0
-        return count
+        # * set for whole lists by OrderRoom.load_connected_users
+        if hasattr(self, "connected_users_count"):
+            return self.connected_users_count
+        return get_presence_backend().connected_users(self.get_presence_room())
+
+    def get_presence_room(self):
+        return f"{ORDER_SELECTION_CHANNEL_GROUP}{self.pk}"
+
+    @classmethod
+    def load_connected_users(cls, rooms):
+        """Fetch the connected users of every room with one presence lookup and return the rooms as a list."""
+        rooms = list(rooms)
+        counts = get_presence_backend().connected_users_many([room.get_presence_room() for room in rooms])
+        for room in rooms:
+            room.connected_users_count = counts[room.get_presence_room()]
+        return rooms
 
     # ! removed in favorite of django-channel-presence
     # def connected_users(self):
@@ -151,7 +184,8 @@ class OrderRoom(models.Model):
         return self.m2m_users.remove(user)
 
     def get_time_left(self):
-        end_time = self.created_at + timedelta(minutes=configuration().total_order_time_limit) - timedelta(minutes=configuration().order_room_lock_limit)
+        config = configuration()
+        end_time = self.created_at + timedelta(minutes=config.total_order_time_limit) - timedelta(minutes=config.order_room_lock_limit)
         current_time = timezone.now()
         remaining_time = end_time - current_time
         return int(remaining_time.total_seconds())
@@ -159,6 +193,13 @@ class OrderRoom(models.Model):
     def can_join(self):
         return self.get_time_left() > 0
 
+    def get_business_day(self):
+        """Creation time range of the orders shown in the room, today's unless the room was opened before midnight and is still running."""
+        start, end = business_day_range()
+        if self.created_at < start < self.created_at + timedelta(minutes=configuration().total_order_time_limit):
+            start = self.created_at
+        return start, end
+
 
 class OrderRoomUser(models.Model):
     fk_user = models.ForeignKey(UserModel, verbose_name=_("Users"), on_delete=models.CASCADE)
@@ -180,9 +221,17 @@ class OrderRoomUser(models.Model):
         time_left = cls.objects.get(fk_user=user, fk_order_room=order_room).get_time_left()
         return {"disabled": time_left <= 0, "reason": "time_out", "time_left": time_left}
 
+    @classmethod
+    async def acheck_ordering_timeout(cls, user, order_room):
+        room_user = await cls.objects.aget(fk_user=user, fk_order_room=order_room)
+        time_left = await sync_to_async(room_user.get_time_left)()
+        return {"disabled": time_left <= 0, "reason": "time_out", "time_left": time_left}
+
 
 class Restaurant(models.Model):
     name = models.CharField(_("Restaurant Name"), max_length=SMALL_NAME_LENGTH, unique=True)
+    # * version of the rendered restaurant row (orderApp.rowCache)
+    updated_at = models.DateTimeField(_("Updated at"), auto_now=True)
 
     def __str__(self):
         return self.name
@@ -224,34 +273,94 @@ class Order(models.Model):
     finished_ordering = models.BooleanField(_("Finished Ordering"), default=False)
     delete_timer = models.DateTimeField(_("Delete Timer"), default=archive_time)
     order_archived = models.BooleanField(_("Is Done ?"), default=False)
+    # ! denormalized from the order items, kept by orderApp.signals, repair with `manage.py recompute_order_totals`
+    total = models.DecimalField(_("Total"), max_digits=9, decimal_places=2, default=0)
+    items_count = models.PositiveIntegerField(_("Items Count"), default=0)
     objects = CustomOrderManager()
 
+    class Meta:
+        # ! finished_ordering is last, booleans compile to a bare column (or NOT column) that can't seek an index
+        # ! ahead of the created_at range, it is only checked from the index entries
+        indexes = [
+            # * last order, order limit and my orders of a user in a room
+            models.Index(fields=["fk_order_room", "fk_user", "created_at", "finished_ordering"], name="order_room_user_day_idx"),
+            # * members orders list and summary of a room
+            models.Index(fields=["fk_order_room", "created_at", "finished_ordering"], name="order_room_day_idx"),
+        ]
+
     def __str__(self):
         keys = [self.order_user(), self.total_order()]
         return " | ".join(list(map(str, keys)))
 
     def order_user(self):
+        # * annotated by Order.with_usernames, saves the user lookup per row
+        if hasattr(self, "order_username"):
+            return self.order_username
         return self.fk_user.username
 
     def total_order(self):
-        return round(self.orderitem_set.aggregate(total=Sum(F("quantity") * F("fk_menu_item__price"), output_field=models.DecimalField(max_digits=9, decimal_places=2)))["total"], 2)
+        return round(self.total, 2)
+
+    @classmethod
+    def with_usernames(cls, queryset):
+        return queryset.annotate(order_username=F("fk_user__username"))
+
+    @classmethod
+    def recompute_totals(cls, **filters):
+        """Recompute ``total`` and ``items_count`` of the matching orders (archived included) in a single UPDATE."""
+        items = OrderItem.objects.filter(fk_order=OuterRef("pk")).order_by().values("fk_order")
+        # ! items written by update()/bulk_create() without a snapshot fall back to their menu item, like the group order summary
+        price = Coalesce("price", "fk_menu_item__price", Value(0), output_field=models.DecimalField(max_digits=9, decimal_places=2))
+        item_totals = items.annotate(total=Sum(F("quantity") * price, output_field=models.DecimalField(max_digits=9, decimal_places=2))).values("total")
+        item_counts = items.annotate(count=Count("pk")).values("count")
+        return cls._base_manager.filter(**filters).update(
+            total=Coalesce(Subquery(item_totals), Value(0), output_field=models.DecimalField(max_digits=9, decimal_places=2)),
+            items_count=Coalesce(Subquery(item_counts), Value(0)),
+        )
 
     @classmethod
     def check_order_limit_per_room(cls, user, order_room):
         disabled = cls.objects.filter(fk_user=user, fk_order_room=order_room, finished_ordering=True).count() >= configuration().order_limit
         return {"disabled": disabled, "reason": "order_limit"}
 
+    @classmethod
+    async def acheck_order_limit_per_room(cls, user, order_room):
+        orders_count = await cls.objects.filter(fk_user=user, fk_order_room=order_room, finished_ordering=True).acount()
+        disabled = orders_count >= (await sync_to_async(configuration)()).order_limit
+        return {"disabled": disabled, "reason": "order_limit"}
+
 
 class OrderItem(models.Model):
     fk_order = models.ForeignKey(Order, verbose_name=_("Order"), on_delete=models.CASCADE)
-    fk_menu_item = models.ForeignKey(MenuItem, verbose_name=_("Menu Item"), on_delete=models.CASCADE)
+    # ! menu item can be edited or deleted later, the order keeps the snapshot below
+    fk_menu_item = models.ForeignKey(MenuItem, verbose_name=_("Menu Item"), on_delete=models.SET_NULL, null=True)
     quantity = models.PositiveIntegerField(_("Quantity"), validators=[PositiveValueValidator(0)])
+    item_name = models.CharField(_("Item Name"), max_length=SMALL_NAME_LENGTH, default="")
+    restaurant_name = models.CharField(_("Restaurant Name"), max_length=SMALL_NAME_LENGTH, default="")
+    # * null until snapshotted, `manage.py backfill_order_item_snapshots` fills older rows
+    price = models.DecimalField(_("Price"), max_digits=9, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # * covers Order.recompute_totals, the items of an order are summed without reading the rows
+            models.Index(fields=["fk_order", "price", "quantity"], name="order_item_totals_idx"),
+        ]
 
     def __str__(self):
-        keys = [self.fk_order, self.fk_menu_item, self.quantity, self.total_order_item()]
+        keys = [self.fk_order, self.item_name, self.quantity, self.total_order_item()]
         return " | ".join(list(map(str, keys)))
 
+    def save(self, *args, **kwargs):
+        if self.price is None and self.fk_menu_item_id:
+            self.snapshot_menu_item()
+        super().save(*args, **kwargs)
+
+    def snapshot_menu_item(self):
+        self.item_name = self.fk_menu_item.name
+        self.restaurant_name = self.fk_menu_item.fk_restaurant.name
+        self.price = self.fk_menu_item.price
+
     def total_order_item(self):
-        if self.fk_menu_item.price and self.quantity:
-            return self.fk_menu_item.price * self.quantity
+        if self.price and self.quantity:
+            return self.price * self.quantity
         return 0
@@ -1,6 +1,7 @@
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
-from django.db.models import DecimalField, F, Sum
-from django.utils import timezone
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce, NullIf
 from django.utils.translation import gettext_lazy as _
 
 from orderApp.context import BaseContext
@@ -10,13 +11,43 @@ from orderApp.enums import GeneralContextKeys as GC
 from orderApp.enums import OrderContextKeys as OC
 from orderApp.enums import ViewContextKeys as VC
 from orderApp.models import MenuItem, Order, OrderItem, OrderRoomUser, Restaurant
-from orderApp.utils import calculate_totals, group_nested_data, spacial_rounder
+from orderApp.summaryCache import summary_cache
+from orderApp.utils import build_order_summary
 
 UserModel = get_user_model()
 
 
 class OrderSelectionContext(BaseContext):
     view_type = CV.ORDER_SELECTION
+    static_context = {
+        "base": {
+            VC.MAIN_TITLE: _("Orders"),
+            VC.TITLE_ACTION: _("Add Restaurant"),
+            VC.TOP_SECTION_INFO: "orderSelection/topSection/middleTitle.html",
+        },
+        "list": {
+            VC.LIST_TABLE_BODY_ID: "group_table_body",
+            VC.LIST_SECTION_TITLE: _("Members Orders"),
+            VC.LIST_MESSAGE_TYPE: "showMemberItemOrders",
+            VC.LIST_TABLE_HEADERS: [_("User"), _("Total")],
+            VC.LIST_SECTION_TEMPLATE: "base/bodySection/listSection.html",
+            VC.LIST_SECTION_BODY_TEMPLATE: "base/bodySection/listSectionBody.html",
+            VC.LIST_SECTION_TABLE_BODY_TEMPLATE: "orderSelection/bodySection/listSectionBodyTable.html",
+        },
+        "details": {
+            VC.DETAILS_SECTION_TITLE: _("Order Items"),
+            VC.DETAILS_MESSAGE_TYPE: "deleteOrderItem",
+            VC.DETAILS_TABLE_HEADERS: [_("Item"), _("Restaurant"), _("Quantity"), _("Price"), _("Total")],
+            VC.DETAILS_SECTION_TEMPLATE: "base/bodySection/detailsSection.html",
+            VC.DETAILS_SECTION_BODY_TEMPLATE: "base/bodySection/detailsSectionBody.html",
+            VC.DETAILS_SECTION_TABLE_BODY_TEMPLATE: "orderSelection/bodySection/detailsSectionBodyTable.html",
+        },
+        "form": {
+            OC.FORM_ORDER_ID: OC.FORM_ORDER_ID,
+            VC.FORM_SECTION_TEMPLATE: "orderSelection/bottomSection/form/formOrderItem.html",
+            VC.EXTRA_FORM_SECTION_TEMPLATE: "orderSelection/bottomSection/actions/orderActions.html",
+        },
+    }
     room_user = None
     restaurant = None
 
@@ -43,11 +74,8 @@ class OrderSelectionContext(BaseContext):
         ctx = super().get_base_context()
         ctx.update(
             {
-                VC.MAIN_TITLE: _("Orders"),
-                VC.TITLE_ACTION: _("Add Restaurant"),
                 GC.ROOM_NUMBER: self.get_order_room().name,
                 OC.TIME_LEFT: self.get_room_user().get_time_left(),
-                VC.TOP_SECTION_INFO: "orderSelection/topSection/middleTitle.html",
             }
         )
         return ctx
@@ -62,32 +90,15 @@ class OrderSelectionContext(BaseContext):
         else:
             LIST_SECTION_DATA = self.get_all_orders(user=self.get_user(), order_room=self.get_order_room())
 
-        ctx.update(
-            {
-                VC.LIST_TABLE_BODY_ID: "group_table_body",
-                VC.LIST_SECTION_TITLE: _("Members Orders"),
-                VC.LIST_MESSAGE_TYPE: "showMemberItemOrders",
-                VC.LIST_SECTION_DATA: LIST_SECTION_DATA,
-                VC.LIST_TABLE_HEADERS: [_("User"), _("Total")],
-                VC.LIST_SECTION_TEMPLATE: "base/bodySection/listSection.html",
-                VC.LIST_SECTION_BODY_TEMPLATE: "base/bodySection/listSectionBody.html",
-                VC.LIST_SECTION_TABLE_BODY_TEMPLATE: "orderSelection/bodySection/listSectionBodyTable.html",
-            }
-        )
+        ctx[VC.LIST_SECTION_DATA] = LIST_SECTION_DATA
         return ctx
 
     def get_details_context(self, instance=None, order_instance=None, disable_remove_button=False):
         ctx = super().get_details_context()
         ctx.update(
             {
-                VC.DETAILS_SECTION_TITLE: _("Order Items"),
-                VC.DETAILS_MESSAGE_TYPE: "deleteOrderItem",
                 OC.DISABLE_REMOVE_BUTTON: disable_remove_button,
-                VC.DETAILS_SECTION_DATA: ([instance] if instance else self.get_last_order_items() if not order_instance else self.get_order_items(order_instance)),
-                VC.DETAILS_TABLE_HEADERS: [_("Item"), _("Restaurant"), _("Quantity"), _("Price"), _("Total")],
-                VC.DETAILS_SECTION_TEMPLATE: "base/bodySection/detailsSection.html",
-                VC.DETAILS_SECTION_BODY_TEMPLATE: "base/bodySection/detailsSectionBody.html",
-                VC.DETAILS_SECTION_TABLE_BODY_TEMPLATE: "orderSelection/bodySection/detailsSectionBodyTable.html",
+                VC.DETAILS_SECTION_DATA: ([instance] if instance else self.lazy("last_order_items", self.get_last_order_items) if not order_instance else self.get_order_items(order_instance)),
             }
         )
         return ctx
@@ -95,35 +106,32 @@ class OrderSelectionContext(BaseContext):
     def get_form_context(self, restaurant_instance=None):
         ctx = super().get_form_context()
 
-        disable = any(
-            [
-                self.check_ordering_timeout()["disabled"],
-                self.check_order_limit_per_room()["disabled"],
-            ]
-        )
-        order = None
-        if not disable:
-            order = get_last_order(user=self.get_user(), order_room=self.get_order_room())
+        # * the checks and the last order only run when the form template reads them
+        disable = self.lazy("disable_order_item_form", self.is_order_form_disabled)
+        order = self.lazy("order", self.get_form_order, disable)
         ctx.update(
             {
                 OC.RESTAURANTS: self.get_restaurant_list(),
                 OC.MENU_ITEMS: MenuItem.get_restaurant_menu_items(restaurant=restaurant_instance) if restaurant_instance else [],
                 OC.DISABLE_ORDER_ITEM_FORM: disable,
                 OC.ORDER: order,
-                OC.FORM_ORDER_ID: OC.FORM_ORDER_ID,
-                VC.FORM_SECTION_TEMPLATE: "orderSelection/bottomSection/form/formOrderItem.html",
-                VC.EXTRA_FORM_SECTION_TEMPLATE: "orderSelection/bottomSection/actions/orderActions.html",
             }
         )
         return ctx
 
+    def is_order_form_disabled(self):
+        return self.check_ordering_timeout()["disabled"] or self.check_order_limit_per_room()["disabled"]
+
+    def get_form_order(self, disable):
+        if disable():
+            return None
+        return get_last_order(user=self.get_user(), order_room=self.get_order_room())
+
     def get_all_orders(self, user=None, order_room=None):
         filter_kwargs = {"finished_ordering": True}
         if user:
             filter_kwargs.update({"fk_user": user})
-        if order_room:
-            filter_kwargs.update({"fk_order_room": order_room})
-        orders = orders_query().filter(**filter_kwargs)
+        orders = orders_query(order_room or self.get_order_room()).filter(**filter_kwargs)
         return orders
 
     def get_extra_context(self, all_orders=True):
@@ -154,96 +162,61 @@ class OrderSelectionContext(BaseContext):
     def get_restaurant_list(self):
         return Restaurant.objects.all()
 
-    def groupOrderSummary(self):
-        orderTotalSummary = (
-            Restaurant.objects.filter(menuitem__orderitem__fk_order__created_at__date=timezone.now(), menuitem__orderitem__fk_order__fk_order_room=self.get_order_room())
+    def get_group_order_summary(self):
+        """``groupOrderSummary`` or None when the room has no finished orders today, cached per room in orderApp.summaryCache."""
+        return summary_cache.get(self.get_order_room().pk, self.build_group_order_summary)
+
+    def build_group_order_summary(self):
+        if not self.get_all_orders(order_room=self.get_order_room()).exists():
+            return None
+        return self.groupOrderSummary()
+
+    def get_summary_rows(self):
+        """Quantity and total of the room's order items summed per restaurant, user, item, price and finished state."""
+        start, end = self.get_order_room().get_business_day()
+        return (
+            OrderItem.objects.filter(fk_order__fk_order_room=self.get_order_room(), fk_order__created_at__gte=start, fk_order__created_at__lt=end)
+            # ! items written by update()/bulk_create() without a snapshot fall back to their menu item
+            .annotate(item_price=Coalesce("price", "fk_menu_item__price", Value(0), output_field=DecimalField(max_digits=9, decimal_places=2)))
             .values(
-                restaurant=F("name"),
-                item=F("menuitem__name"),
-                price=F("menuitem__price"),
-                # user=F("menuitem__orderitem__fk_order__fk_user__username"),
-            )
-            .annotate(
-                quantity=Sum("menuitem__orderitem__quantity"),
-                total=Sum(F("menuitem__orderitem__quantity") * F("menuitem__price"), output_field=DecimalField(max_digits=9, decimal_places=2)),
+                "item_price",
+                restaurant=Coalesce(NullIf("restaurant_name", Value("")), "fk_menu_item__fk_restaurant__name", Value("")),
+                item=Coalesce(NullIf("item_name", Value("")), "fk_menu_item__name", Value("")),
+                user=F("fk_order__fk_user__username"),
+                finished=F("fk_order__finished_ordering"),
             )
-            .distinct()
+            # * annotated under other names as price and quantity would clash with the OrderItem fields
+            .annotate(items_quantity=Sum("quantity"), items_total=Sum(F("quantity") * F("item_price"), output_field=DecimalField(max_digits=9, decimal_places=2)))
+            .order_by()
         )
-        orderTotalSummary2 = (
-            Restaurant.objects.filter(menuitem__orderitem__fk_order__created_at__date=timezone.now(), menuitem__orderitem__fk_order__fk_order_room=self.get_order_room())
-            .values(
-                restaurant=F("name"),
-                item=F("menuitem__name"),
-                price=F("menuitem__price"),
-                user=F("menuitem__orderitem__fk_order__fk_user__username"),
-            )
-            .annotate(
-                quantity=Sum("menuitem__orderitem__quantity"),
-                total=Sum(F("menuitem__orderitem__quantity") * F("menuitem__price"), output_field=DecimalField(max_digits=9, decimal_places=2)),
-            )
-            .distinct()
-        )
-        spacial_rounder(orderTotalSummary, ["total", "price"], 2)
-        spacial_rounder(orderTotalSummary2, ["total", "price"], 2)
-
-        grand_totals_orderTotalSummary = calculate_totals(orderTotalSummary, ["quantity", "total"])
-
-        orderTotalSummaryGrouped = group_nested_data(orderTotalSummary, ["restaurant"])
-
-        totals_orderTotalSummary = {restaurant: calculate_totals(items, ["quantity", "total"]) for restaurant, items in orderTotalSummaryGrouped.items()}
-
-        orderUsersTotalSummaryGrouped = group_nested_data(orderTotalSummary2, ["restaurant", "user"])
-
-        totals_orderUsersTotalSummaryGrouped = {
-            restaurant: {user: calculate_totals(orders, ["quantity", "total"]) for user, orders in userItems.items()} for restaurant, userItems in orderUsersTotalSummaryGrouped.items()
-        }
-
-        orderUsersSummary = (
-            UserModel.objects.filter(order__created_at__date=timezone.now(), order__finished_ordering=True, order__fk_order_room=self.get_order_room())
-            .values(
-                user=F("username"),
-                restaurant=F("order__orderitem__fk_menu_item__fk_restaurant__name"),
-                item=F("order__orderitem__fk_menu_item__name"),
-                price=F("order__orderitem__fk_menu_item__price"),
-            )
-            .annotate(
-                quantity=Sum("order__orderitem__quantity"),
-                total=Sum(F("order__orderitem__quantity") * F("order__orderitem__fk_menu_item__price"), output_field=DecimalField(max_digits=9, decimal_places=2)),
-            )
-            .distinct()
-        )
-        spacial_rounder(orderUsersSummary, ["total", "price"], 2)
-
-        orderUsersRestaurantSummaryGrouped = group_nested_data(orderUsersSummary, ["user", "restaurant"])
-
-        orderUsersSummaryGrouped = group_nested_data(orderUsersSummary, ["user"])
-
-        totals_orderUsersSummaryGrouped = {user: calculate_totals(items, ["quantity", "total"]) for user, items in orderUsersSummaryGrouped.items()}
 
+    def groupOrderSummary(self):
+        # * one query for the summed rows, orderApp.utils.build_order_summary builds every grouping and total from them in one pass
+        rows = self.get_summary_rows()
         return {
-            "orderTotalSummaryGrouped": orderTotalSummaryGrouped,
-            "totals_orderTotalSummary": totals_orderTotalSummary,
-            "grand_totals_orderTotalSummary": grand_totals_orderTotalSummary,
-            "orderUsersTotalSummaryGrouped": orderUsersTotalSummaryGrouped,
-            "totals_orderUsersTotalSummaryGrouped": totals_orderUsersTotalSummaryGrouped,
-            "orderUsersRestaurantSummaryGrouped": orderUsersRestaurantSummaryGrouped,
-            "totals_orderUsersSummaryGrouped": totals_orderUsersSummaryGrouped,
+            **build_order_summary({**row, "price": row["item_price"], "quantity": row["items_quantity"], "total": row["items_total"]} for row in rows),
             "showTables": True,
             "table_headers": ["#", _("Item"), _("Price"), _("Quantity"), _("Total")],
         }
 
 
-def orders_query():
-    # TODO check this date condition is it valid for orders around midnight
-    return Order.objects.filter(created_at__date=timezone.now())
+def orders_query(order_room, business_day=None):
+    # * created_at range instead of created_at__date so the Order indexes apply, see OrderRoom.get_business_day for orders around midnight
+    start, end = business_day or order_room.get_business_day()
+    return Order.with_usernames(Order.objects.filter(fk_order_room=order_room, created_at__gte=start, created_at__lt=end))
 
 
 def get_last_order(user, order_room, finished=False):
-    return orders_query().filter(fk_user=user, fk_order_room=order_room, finished_ordering=finished).last()
+    return orders_query(order_room).filter(fk_user=user, finished_ordering=finished).last()
+
+
+async def aget_last_order(user, order_room, finished=False):
+    business_day = await sync_to_async(order_room.get_business_day)()
+    return await orders_query(order_room, business_day).filter(fk_user=user, finished_ordering=finished).alast()
 
 
 def get_user_order(user, order_room, finished=False):
-    return orders_query().filter(fk_user=user, fk_order_room=order_room, finished_ordering=finished)
+    return orders_query(order_room).filter(fk_user=user, finished_ordering=finished)
 
 
 def finish_order(order):
@@ -252,11 +225,25 @@ def finish_order(order):
         return error_msg
 
     order = Order.objects.get(id=order)
-    orderItems = OrderItem.objects.filter(fk_order=order).exists()
+    # * items_count is kept by orderApp.signals, no need to query the items
+    if order.items_count:
+        order.finished_ordering = True
+        # ! total and items_count of this read may already be stale, an item write recomputes them concurrently
+        order.save(update_fields=["finished_ordering"])
+        return {"finished": True}
+    else:
+        return error_msg
 
-    if orderItems:
+
+async def afinish_order(order):
+    error_msg = {"finished": False, "reason": "add_items"}
+    if not order:
+        return error_msg
+
+    order = await Order.objects.aget(id=order)
+    if order.items_count:
         order.finished_ordering = True
-        order.save()
+        await order.asave(update_fields=["finished_ordering"])
         return {"finished": True}
     else:
         return error_msg
@@ -280,3 +267,23 @@ def create_order_checks(user, order_room):
         return check
     check = {"disabled": False}
     return check
+
+
+async def aget_order(user, order_room):
+    check = await acreate_order_checks(user, order_room)
+    if check["disabled"]:
+        return check
+    # * get last unfinished order or create new one
+    order = (await Order.objects.aget_or_create(fk_user=user, fk_order_room=order_room, finished_ordering=False))[0]
+    return {"order": order, "created": True}
+
+
+async def acreate_order_checks(user, order_room):
+    check = await Order.acheck_order_limit_per_room(user=user, order_room=order_room)
+    if check["disabled"]:
+        return check
+    check = await OrderRoomUser.acheck_ordering_timeout(user=user, order_room=order_room)
+    if check["disabled"]:
+        return check
+    check = {"disabled": False}
+    return check
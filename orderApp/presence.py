@@ -0,0 +1,199 @@
+import asyncio
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels_presence.models import Presence, Room
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Count
+from django.utils.module_loading import import_string
+
+
+def presence_max_age():
+    return getattr(settings, "CHANNELS_PRESENCE_MAX_AGE", 60)
+
+
+class DatabasePresence:
+    """Presence stored in django-channels-presence tables, shared by every worker."""
+
+    def add(self, room, channel_name, user=None):
+        Room.objects.add(room, channel_name, user)
+
+    def remove(self, room, channel_name):
+        Room.objects.remove(room, channel_name)
+
+    def touch(self, channel_name):
+        Presence.objects.touch(channel_name)
+
+    def connected_users(self, room):
+        return self.connected_users_many([room])[room]
+
+    def connected_users_many(self, rooms):
+        """``{room: distinct connected users}`` for all ``rooms`` in one query."""
+        counts = dict.fromkeys(rooms, 0)
+        presences = Presence.objects.filter(room__channel_name__in=counts).values_list("room__channel_name").annotate(users=Count("user", distinct=True))
+        counts.update(presences)
+        return counts
+
+    def prune_presences(self, age=None):
+        Room.objects.prune_presences(age=age)
+
+    def prune_rooms(self):
+        Room.objects.prune_rooms()
+
+
+class MemoryPresence:
+    """
+    Presence kept in process memory, no database writes on connect/disconnect/heartbeat.
+
+    Rooms hold ``{channel_name: user_pk}`` plus a per room counter of connected users,
+    so ``connected_users`` is a dict lookup. Counts only cover sockets served by this
+    process, so it only suits single worker deployments (``check_workers`` refuses to
+    start gunicorn otherwise), several workers share ``BrokerPresence`` or ``DatabasePresence``.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rooms = defaultdict(dict)
+        self.room_users = defaultdict(Counter)
+        self.channel_rooms = defaultdict(set)
+        self.last_seen = {}
+        # * event loop of the worker's sockets, prune_presences runs its group discards there
+        self.loop = None
+
+    def add(self, room, channel_name, user=None):
+        user_pk = user.pk if user and user.is_authenticated else None
+        with self.lock:
+            created = channel_name not in self.rooms[room]
+            if created:
+                self.rooms[room][channel_name] = user_pk
+                self.channel_rooms[channel_name].add(room)
+                if user_pk is not None:
+                    self.room_users[room][user_pk] += 1
+            self.last_seen[channel_name] = time.monotonic()
+        if created:
+            async_to_sync(self.group_add)(room, channel_name)
+
+    async def group_add(self, room, channel_name):
+        self.loop = asyncio.get_running_loop()
+        await get_channel_layer().group_add(room, channel_name)
+
+    async def group_discard_many(self, memberships):
+        layer = get_channel_layer()
+        for room, channel_name in memberships:
+            await layer.group_discard(room, channel_name)
+
+    def remove(self, room, channel_name):
+        with self.lock:
+            removed = self._remove(room, channel_name)
+        if removed:
+            async_to_sync(get_channel_layer().group_discard)(room, channel_name)
+
+    def _remove(self, room, channel_name):
+        if channel_name not in self.rooms.get(room, {}):
+            return False
+        user_pk = self.rooms[room].pop(channel_name)
+        if user_pk is not None:
+            self.room_users[room][user_pk] -= 1
+            if self.room_users[room][user_pk] <= 0:
+                del self.room_users[room][user_pk]
+        if not self.rooms[room]:
+            del self.rooms[room]
+            self.room_users.pop(room, None)
+        self.channel_rooms[channel_name].discard(room)
+        if not self.channel_rooms[channel_name]:
+            del self.channel_rooms[channel_name]
+            self.last_seen.pop(channel_name, None)
+        return True
+
+    def touch(self, channel_name):
+        with self.lock:
+            if channel_name in self.last_seen:
+                self.last_seen[channel_name] = time.monotonic()
+
+    def connected_users(self, room):
+        return len(self.room_users.get(room, ()))
+
+    def connected_users_many(self, rooms):
+        with self.lock:
+            return {room: len(self.room_users.get(room, ())) for room in rooms}
+
+    def prune_presences(self, age=None):
+        cutoff = time.monotonic() - (presence_max_age() if age is None else age)
+        expired = []
+        with self.lock:
+            for channel_name in [channel_name for channel_name, last_seen in self.last_seen.items() if last_seen < cutoff]:
+                for room in list(self.channel_rooms.get(channel_name, ())):
+                    if self._remove(room, channel_name):
+                        expired.append((room, channel_name))
+        # ! called from the scheduler thread (cleaner.py), a loop of its own would open its own channel layer connection
+        if expired and self.loop is not None and not self.loop.is_closed():
+            asyncio.run_coroutine_threadsafe(self.group_discard_many(expired), self.loop)
+
+    def prune_rooms(self):
+        # * empty rooms are dropped as soon as their last presence leaves
+        pass
+
+
+class BrokerPresence:
+    """
+    Presence kept by the broker of core.unix_layer (``CHANNEL_LAYER="unix"``), shared by
+    every worker of the host like ``DatabasePresence`` but without database writes.
+
+    Sockets whose heartbeats stop are dropped by the broker itself after
+    ``CHANNELS_PRESENCE_MAX_AGE`` seconds, as are the sockets of a worker that goes away.
+    """
+
+    def get_layer(self):
+        from core.unix_layer import UnixSocketChannelLayer
+
+        layer = get_channel_layer()
+        if not isinstance(layer, UnixSocketChannelLayer):
+            raise ImproperlyConfigured(f"{self.__class__.__name__} needs the core.unix_layer channel layer (CHANNEL_LAYER=unix), not {layer.__class__.__name__}")
+        return layer
+
+    def add(self, room, channel_name, user=None):
+        async_to_sync(self.aadd)(room, channel_name, user.pk if user and user.is_authenticated else None)
+
+    async def aadd(self, room, channel_name, user_pk):
+        layer = self.get_layer()
+        await layer.group_add(room, channel_name)
+        await layer.presence_add(room, channel_name, user_pk, presence_max_age())
+
+    def remove(self, room, channel_name):
+        # * the broker discards the group membership with the presence
+        async_to_sync(self.get_layer().presence_remove)(room, channel_name)
+
+    def touch(self, channel_name):
+        async_to_sync(self.get_layer().presence_touch)(channel_name, presence_max_age())
+
+    def connected_users(self, room):
+        return self.connected_users_many([room])[room]
+
+    def connected_users_many(self, rooms):
+        rooms = list(rooms)
+        if not rooms:
+            return {}
+        return async_to_sync(self.get_layer().presence_count)(rooms)
+
+    def prune_presences(self, age=None):
+        # * the broker drops presences without heartbeat itself
+        pass
+
+    def prune_rooms(self):
+        pass
+
+
+@lru_cache
+def get_presence_backend():
+    return import_string(settings.PRESENCE_BACKEND)()
+
+
+def check_workers(workers):
+    """Refuse a presence backend that only counts the sockets of its own process when ``workers`` processes serve the rooms."""
+    if workers > 1 and issubclass(import_string(settings.PRESENCE_BACKEND), MemoryPresence):
+        raise ImproperlyConfigured(f"{settings.PRESENCE_BACKEND} would report per worker room counts with {workers} workers, use orderApp.presence.BrokerPresence or DatabasePresence")
@@ -1,10 +1,14 @@
+from django.conf import settings
 from django.urls import re_path
 
-from . import consumers
+from . import asyncConsumers, consumers
+
+# ! switch between sync and async order selection consumer for A/B comparison
+OrderSelectionConsumer = asyncConsumers.AsyncOrderSelectionConsumer if settings.ASYNC_ORDER_SELECTION_CONSUMER else consumers.OrderSelectionConsumer
 
 websocket_urlpatterns_order = [
     re_path(r"ws/index/", consumers.OrderGroupConsumer.as_asgi()),
     re_path(r"ws/room/(?P<group_name>\w+)/$", consumers.OrderRoomConsumer.as_asgi()),
-    re_path(r"ws/order/(?P<group_name>\w+)/(?P<room_name>\w+)/$", consumers.OrderSelectionConsumer.as_asgi()),
+    re_path(r"ws/order/(?P<group_name>\w+)/(?P<room_name>\w+)/$", OrderSelectionConsumer.as_asgi()),
     re_path(r"ws/restaurant/", consumers.RestaurantConsumer.as_asgi()),
 ]
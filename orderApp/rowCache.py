@@ -0,0 +1,73 @@
+import threading
+from collections import Counter, OrderedDict, defaultdict
+
+from django.conf import settings
+from django.utils import translation
+
+
+class RowFragmentCache:
+    """
+    Rendered list rows (``{% rowcache %}`` in orderApp.templatetags.rowCache), least recently used
+    first out once settings.ROW_FRAGMENT_CACHE_SIZE rows are kept.
+
+    Keys hold the template, model, pk, ``updated_at`` of the row, language and whatever the template
+    varies on (viewer role, counts), so a row saved by another process is simply a miss here.
+    orderApp.signals drops the rows of this process right away.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.rows = defaultdict(set)
+        self.stats = defaultdict(Counter)
+
+    def get_key(self, template_name, item, vary_on):
+        return (template_name, item._meta.label, item.pk, getattr(item, "updated_at", None), translation.get_language(), *vary_on)
+
+    def get(self, template_name, item, vary_on, render):
+        if settings.ROW_FRAGMENT_CACHE_SIZE <= 0:
+            return render()
+        key = self.get_key(template_name, item, vary_on)
+        with self.lock:
+            html = self.entries.get(key)
+            if html is not None:
+                self.entries.move_to_end(key)
+                self.stats[template_name]["hits"] += 1
+                return html
+            self.stats[template_name]["misses"] += 1
+        html = render()
+        with self.lock:
+            self.entries[key] = html
+            self.rows[key[1:3]].add(key)
+            while len(self.entries) > settings.ROW_FRAGMENT_CACHE_SIZE:
+                self.discard(next(iter(self.entries)), "evictions")
+        return html
+
+    def discard(self, key, reason):
+        # ! caller holds the lock
+        del self.entries[key]
+        row = self.rows[key[1:3]]
+        row.discard(key)
+        if not row:
+            del self.rows[key[1:3]]
+        self.stats[key[0]][reason] += 1
+
+    def invalidate(self, model, pk):
+        with self.lock:
+            for key in list(self.rows.get((model._meta.label, pk), ())):
+                self.discard(key, "invalidations")
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.rows.clear()
+
+    def report(self):
+        report = []
+        for template_name, entry in sorted(self.stats.items()):
+            lookups = entry["hits"] + entry["misses"]
+            report.append((template_name, {**entry, "hit_rate": round(entry["hits"] / lookups, 3) if lookups else 0}))
+        return report
+
+
+row_cache = RowFragmentCache()
@@ -0,0 +1,105 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from orderApp.enums import (
+    ORDER_GROUP_USER_CHANNEL_GROUP,
+    ORDER_ROOM_CHANNEL_GROUP,
+    ORDER_SELECTION_CHANNEL_GROUP,
+    SUMMARY_CACHE_CHANNEL_GROUP,
+)
+from orderApp.models import Order, OrderGroup, OrderItem, OrderRoom, Restaurant
+from orderApp.rowCache import row_cache
+from orderApp.summaryCache import summary_cache
+
+
+def sync_order_group_subscription(user_pk, group_number):
+    # * index page sockets of the user re-check their membership and join/leave the members channel group
+    async_to_sync(get_channel_layer().group_send)(
+        f"{ORDER_GROUP_USER_CHANNEL_GROUP}{user_pk}",
+        {"type": "syncOrderGroupSubscription", "message": {"group_number": group_number}},
+    )
+
+
+def reset_order_summary(room_pk):
+    # * this process drops its copy right away, every other process once through its summary cache channel
+    summary_cache.invalidate(room_pk)
+    async_to_sync(get_channel_layer().group_send)(f"{SUMMARY_CACHE_CHANNEL_GROUP}{room_pk}", {"type": "summary.invalidate", "room_pk": room_pk})
+
+
+def reset_order_objects(channel_group_name):
+    # * room/selection sockets cache their order group and room per connection, make them fetch it again
+    async_to_sync(get_channel_layer().group_send)(channel_group_name, {"type": "resetOrderObjects", "message": {}})
+
+
+@receiver(post_save, sender=OrderGroup)
+@receiver(post_delete, sender=OrderGroup)
+def order_group_changed(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    reset_order_objects(f"{ORDER_ROOM_CHANNEL_GROUP}{instance.group_number}")
+    for room_pk in OrderRoom.objects.filter(fk_order_group=instance).values_list("pk", flat=True):
+        reset_order_objects(f"{ORDER_SELECTION_CHANNEL_GROUP}{room_pk}")
+
+
+@receiver(post_save, sender=OrderRoom)
+@receiver(post_delete, sender=OrderRoom)
+def order_room_changed(sender, instance, created=False, **kwargs):
+    if not created:
+        reset_order_objects(f"{ORDER_SELECTION_CHANNEL_GROUP}{instance.pk}")
+
+
+@receiver(post_save, sender=OrderGroup)
+@receiver(post_delete, sender=OrderGroup)
+@receiver(post_save, sender=OrderRoom)
+@receiver(post_delete, sender=OrderRoom)
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def list_row_changed(sender, instance, **kwargs):
+    # * the new updated_at already misses, this frees the rows of the old version
+    row_cache.invalidate(sender, instance.pk)
+
+
+@receiver(post_save, sender=OrderGroup)
+def order_group_created(sender, instance, created, **kwargs):
+    if created:
+        sync_order_group_subscription(instance.fk_owner_id, instance.group_number)
+
+
+@receiver(m2m_changed, sender=OrderGroup.m2m_users.through)
+def order_group_members_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # * on clear pk_set is None, so collect the current relations before they're removed
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if reverse:
+        # * instance is the user and pk_set holds order group ids
+        order_groups = instance.group_members.all() if action == "pre_clear" else OrderGroup.objects.filter(pk__in=pk_set)
+        for pk, group_number in order_groups.values_list("pk", "group_number"):
+            row_cache.invalidate(OrderGroup, pk)
+            sync_order_group_subscription(instance.pk, group_number)
+    else:
+        row_cache.invalidate(OrderGroup, instance.pk)
+        user_pks = instance.m2m_users.values_list("pk", flat=True) if action == "pre_clear" else pk_set
+        for user_pk in user_pks:
+            sync_order_group_subscription(user_pk, instance.group_number)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def order_item_changed(sender, instance, origin=None, **kwargs):
+    deleted = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin is not None and deleted is not OrderItem:
+        # * cascaded from deleting the order (or its room/user), order_changed handles the order once
+        return
+    # * one UPDATE from the items so concurrent adds/deletes and admin inline edits can't drift the total
+    Order.recompute_totals(pk=instance.fk_order_id)
+    reset_order_summary(instance.fk_order.fk_order_room_id)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def order_changed(sender, instance, **kwargs):
+    # * created, finished or archived orders change what the room summary shows
+    reset_order_summary(instance.fk_order_room_id)
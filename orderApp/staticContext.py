@@ -0,0 +1,55 @@
+import threading
+
+from django.conf import settings
+from django.utils import translation
+from django.utils.functional import Promise
+
+
+def resolve_lazy(value):
+    """Copy of ``value`` with every lazy translation turned into a string of the active language."""
+    if isinstance(value, Promise):
+        return str(value)
+    if isinstance(value, dict):
+        return {key: resolve_lazy(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(resolve_lazy(item) for item in value)
+    return value
+
+
+class StaticContextRegistry:
+    """
+    Static part of every context section (titles, headers, ids, template paths, buttons), built
+    once per context class, section and language from the ``static_context`` of the class and
+    its parents, so section builders only add their data.
+
+    Entries are shared by every render, never change them in place.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def build(self, context_class, section):
+        static = {}
+        for klass in reversed(context_class.__mro__):
+            static.update(vars(klass).get("static_context", {}).get(section, {}))
+        return resolve_lazy(static)
+
+    def get(self, context_class, section):
+        key = (context_class, section, translation.get_language())
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.build(context_class, section)
+            with self.lock:
+                self.entries[key] = entry
+        return entry
+
+    def warm_up(self, context_classes):
+        for language, __ in settings.LANGUAGES:
+            with translation.override(language):
+                for context_class in context_classes:
+                    for section in context_class.static_sections:
+                        self.get(context_class, section)
+
+
+static_contexts = StaticContextRegistry()
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+from collections import Counter
+
+from channels.layers import get_channel_layer
+from django.utils import timezone
+
+from orderApp.enums import SUMMARY_CACHE_CHANNEL_GROUP
+
+
+class SummaryCache:
+    """
+    Group order summaries per room and day, built once and reused until an order
+    or order item of the room changes.
+
+    Rooms are only cached while this process serves one of their sockets. orderApp.signals
+    drops the room of the changing process right away and tells the others through
+    ``SUMMARY_CACHE_CHANNEL_GROUP``, which every process joins with one channel per room,
+    so an invalidation costs one message per process instead of one per socket.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.generations = Counter()
+        self.subscribers = Counter()
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+        # * channel of this process and the task receiving on it, both bound to the worker's event loop
+        self.loop = None
+        self.channel = None
+        self.channel_ready = None
+        self.listener = None
+
+    def get_group(self, room_pk):
+        return f"{SUMMARY_CACHE_CHANNEL_GROUP}{room_pk}"
+
+    def subscribe(self, room_pk):
+        """Count a socket of the room, True for the first one of this process."""
+        with self.lock:
+            self.subscribers[room_pk] += 1
+            return self.subscribers[room_pk] == 1
+
+    def unsubscribe(self, room_pk):
+        """Forget a socket of the room, True for the last one of this process."""
+        with self.lock:
+            self.subscribers[room_pk] -= 1
+            if self.subscribers[room_pk] > 0:
+                return False
+            del self.subscribers[room_pk]
+            self.entries.pop(room_pk, None)
+            return True
+
+    async def asubscribe(self, room_pk):
+        if self.subscribe(room_pk):
+            await get_channel_layer().group_add(self.get_group(room_pk), await self.get_channel())
+
+    async def aunsubscribe(self, room_pk):
+        if self.unsubscribe(room_pk) and self.channel is not None:
+            await get_channel_layer().group_discard(self.get_group(room_pk), self.channel)
+
+    async def get_channel(self):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop or self.listener.done():
+            self.loop, self.channel, self.channel_ready = loop, None, loop.create_future()
+            self.listener = asyncio.ensure_future(self.listen())
+        return await asyncio.shield(self.channel_ready)
+
+    async def listen(self):
+        layer = get_channel_layer()
+        try:
+            self.channel = await layer.new_channel()
+        except Exception as e:
+            self.channel_ready.set_exception(e)
+            raise
+        self.channel_ready.set_result(self.channel)
+        while True:
+            try:
+                message = await layer.receive(self.channel)
+            except Exception as e:
+                # ! invalidations may be lost while the layer is down, nothing cached can be trusted
+                print(e)
+                self.clear()
+                await asyncio.sleep(1)
+                continue
+            self.invalidate(message["room_pk"])
+
+    def get(self, room_pk, build):
+        key = timezone.localdate()
+        with self.lock:
+            entry = self.entries.get(room_pk)
+            if entry and entry[0] == key:
+                self.stats["hits"] += 1
+                return entry[1]
+            self.stats["misses"] += 1
+            generation = self.generations[room_pk]
+        summary = build()
+        with self.lock:
+            # * an invalidation while building means the summary may already be stale
+            if room_pk in self.subscribers and self.generations[room_pk] == generation:
+                self.entries[room_pk] = (key, summary)
+        return summary
+
+    def invalidate(self, room_pk):
+        with self.lock:
+            self.stats["invalidations"] += 1
+            self.generations[room_pk] += 1
+            self.entries.pop(room_pk, None)
+
+    def clear(self):
+        with self.lock:
+            for room_pk in self.entries:
+                self.generations[room_pk] += 1
+            self.entries.clear()
+
+
+summary_cache = SummaryCache()
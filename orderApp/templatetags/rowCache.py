@@ -0,0 +1,44 @@
+from django import template
+
+from orderApp.rowCache import row_cache
+
+register = template.Library()
+
+
+class RowCacheNode(template.Node):
+    def __init__(self, nodelist, item, vary_on):
+        self.nodelist = nodelist
+        self.item = item
+        self.vary_on = vary_on
+
+    def render(self, context):
+        item = self.item.resolve(context)
+        vary_on = tuple(value.resolve(context) for value in self.vary_on)
+        return row_cache.get(self.origin.template_name, item, vary_on, lambda: self.nodelist.render(context))
+
+
+@register.tag
+def rowcache(parser, token):
+    """
+    Render the enclosed list row once per row version, language and the extra values given,
+    everything else the row reads from the context must be the same for every render.
+
+        {% rowcache item role item.get_group_members_count %}...{% endrowcache %}
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires the row model instance")
+    nodelist = parser.parse(("endrowcache",))
+    parser.delete_first_token()
+    return RowCacheNode(nodelist, parser.compile_filter(bits[1]), [parser.compile_filter(bit) for bit in bits[2:]])
+
+
+@register.simple_tag
+def row_role(item, user, member_ids):
+    """Whether the viewer owns and/or is a member of the row's order group, the only difference between group rows of two users."""
+    roles = []
+    if user.pk is not None and user.pk == item.fk_owner_id:
+        roles.append("owner")
+    if item.pk in (member_ids or ()):
+        roles.append("member")
+    return "-".join(roles) or "guest"
@@ -0,0 +1,300 @@
+import asyncio
+import contextlib
+import io
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import DecimalField, F, Sum
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from invitation.forms import CustomInviteForm
+from orderApp.coalescer import UpdateCoalescer
+from orderApp.enums import ViewContextKeys as VC
+from orderApp.models import (
+    MenuItem,
+    Order,
+    OrderGroup,
+    OrderItem,
+    OrderRoom,
+    Restaurant,
+)
+from orderApp.orderGroupContext import OrderGroupContext
+from orderApp.orderSelectionContext import (
+    OrderSelectionContext,
+    get_user_order,
+    orders_query,
+)
+from orderApp.presence import MemoryPresence, check_workers
+from orderApp.rowCache import row_cache
+from orderApp.summaryCache import summary_cache
+from orderApp.traffic import TrafficStats
+from orderApp.utils import templates_builder
+
+UserModel = get_user_model()
+
+
+# ! rows must render, not come from orderApp.rowCache
+@override_settings(ROW_FRAGMENT_CACHE_SIZE=0)
+class GroupListQueriesTests(TestCase):
+    # * the groups with their member counts, and the groups the user is a member of
+    list_queries = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserModel.objects.create_user("owner", "owner@example.com", "password")
+        cls.members = [UserModel.objects.create_user(f"member_{index}", f"member_{index}@example.com", "password") for index in range(3)]
+
+    def create_groups(self, start, stop):
+        for index in range(start, stop):
+            # * alternate owners and memberships so every branch of the row template renders
+            order_group = OrderGroup.objects.create(name=f"group_{index}", fk_owner=self.user if index % 2 else self.members[0])
+            order_group.m2m_users.add(*self.members[: index % 3 + 1])
+            if index % 2:
+                order_group.add_user_to_group(self.user)
+
+    def render(self):
+        context = OrderGroupContext(user=self.user).get_list_context()
+        return "".join(templates_builder(context, [context[VC.LIST_SECTION_BODY_TEMPLATE]]))
+
+    def test_queries_dont_grow_with_the_groups(self):
+        created = 0
+        for size in (1, 10, 50):
+            self.create_groups(created, size)
+            created = size
+            with self.subTest(groups=size), self.assertNumQueries(self.list_queries):
+                html = self.render()
+            self.assertEqual(html.count("row-main"), size)
+
+    def test_cached_rows_render_the_current_invite_form(self):
+        order_group = OrderGroup.objects.create(name="group", fk_owner=self.user)
+        row_cache.clear()
+        self.addCleanup(row_cache.clear)
+        context = OrderGroupContext(user=self.user).get_list_context(instance=order_group)
+        template_name = context[VC.LIST_SECTION_BODY_TEMPLATE]
+        form = CustomInviteForm({"email": "guest@example.com", "fk_order_group": order_group.pk})
+        form.is_valid()
+        form.add_error("email", "already invited")
+        with override_settings(ROW_FRAGMENT_CACHE_SIZE=10):
+            clean = "".join(templates_builder(context, [template_name]))
+            invalid = "".join(templates_builder({**context, "form": form}, [template_name]))
+            sent = "".join(templates_builder({**context, "message": "sent"}, [template_name]))
+        self.assertNotIn(form.errors["email"][0], clean)
+        self.assertIn(form.errors["email"][0], invalid)
+        self.assertIn("sent", sent)
+        self.assertEqual(row_cache.report()[0][1]["hits"], 2)
+
+
+class OrderQueryPlanTests(TestCase):
+    """The hot Order/OrderItem queries of a room's business day must use their index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        users = [UserModel.objects.create_user(f"user_{index}", f"user_{index}@example.com", "password") for index in range(10)]
+        cls.user = users[0]
+        order_group = OrderGroup.objects.create(name="group", fk_owner=cls.user)
+        cls.order_room = OrderRoom.objects.create(name="room", fk_order_group=order_group)
+        for user in users:
+            cls.order_room.add_user_to_room(user)
+        menu_item = MenuItem.objects.create(fk_restaurant=Restaurant.objects.create(name="restaurant"), name="item", price=10)
+        orders = Order.objects.bulk_create(Order(fk_user=users[index % len(users)], fk_order_room=cls.order_room, finished_ordering=index % 4 != 0) for index in range(200))
+        order_items = [OrderItem(fk_order=order, fk_menu_item=menu_item, quantity=1) for order in orders]
+        for order_item in order_items:
+            order_item.snapshot_menu_item()
+        OrderItem.objects.bulk_create(order_items)
+        cls.order = orders[0]
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(index, plan, f"{index} not used:\n{plan}")
+
+    def test_user_orders_use_the_room_user_day_index(self):
+        queries = {
+            "last order": orders_query(self.order_room).filter(fk_user=self.user, finished_ordering=False).order_by("-pk")[:1],
+            "my orders": get_user_order(user=self.user, order_room=self.order_room, finished=True),
+            "order limit": Order.objects.filter(fk_user=self.user, fk_order_room=self.order_room, finished_ordering=True),
+        }
+        for name, queryset in queries.items():
+            with self.subTest(name):
+                self.assertUsesIndex(queryset, "order_room_user_day_idx")
+
+    def test_room_orders_use_the_room_day_index(self):
+        queries = {
+            "members orders": orders_query(self.order_room).filter(finished_ordering=True),
+            "order summary": OrderSelectionContext(user=self.user, order_room=self.order_room).get_summary_rows(),
+        }
+        for name, queryset in queries.items():
+            with self.subTest(name):
+                self.assertUsesIndex(queryset, "order_room_day_idx")
+
+    def test_order_totals_use_the_item_totals_index(self):
+        totals = OrderItem.objects.filter(fk_order=self.order).order_by().values("fk_order").annotate(total=Sum(F("quantity") * F("price"), output_field=DecimalField(max_digits=9, decimal_places=2)))
+        self.assertUsesIndex(totals, "order_item_totals_idx")
+
+
+class SummaryCacheTests(TestCase):
+    """orderApp.signals drops a room's summary once per change, never per socket or cascaded item."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserModel.objects.create_user("user", "user@example.com", "password")
+        order_group = OrderGroup.objects.create(name="group", fk_owner=cls.user)
+        cls.order_room = OrderRoom.objects.create(name="room", fk_order_group=order_group)
+        cls.order_room.add_user_to_room(cls.user)
+        cls.menu_item = MenuItem.objects.create(fk_restaurant=Restaurant.objects.create(name="restaurant"), name="item", price=10)
+
+    def setUp(self):
+        summary_cache.subscribe(self.order_room.pk)
+        self.addCleanup(summary_cache.unsubscribe, self.order_room.pk)
+
+    def get_summary(self):
+        return OrderSelectionContext(user=self.user, order_room=self.order_room).get_group_order_summary()
+
+    def test_unchanged_summary_costs_no_queries(self):
+        order = Order.objects.create(fk_user=self.user, fk_order_room=self.order_room, finished_ordering=True)
+        OrderItem.objects.create(fk_order=order, fk_menu_item=self.menu_item, quantity=1)
+        # * sockets keep their context builder for the whole connection
+        context = OrderSelectionContext(user=self.user, order_room=self.order_room)
+        first = context.get_group_order_summary()
+        with self.assertNumQueries(0):
+            self.assertIs(context.get_group_order_summary(), first)
+        OrderItem.objects.create(fk_order=order, fk_menu_item=self.menu_item, quantity=2)
+        self.assertIsNot(self.get_summary(), first)
+
+    def test_order_delete_resets_once_without_per_item_work(self):
+        order = Order.objects.create(fk_user=self.user, fk_order_room=self.order_room, finished_ordering=True)
+        OrderItem.objects.bulk_create(OrderItem(fk_order=order, fk_menu_item=self.menu_item, quantity=1) for _ in range(5))
+        with mock.patch.object(Order, "recompute_totals") as recompute_totals, mock.patch("orderApp.signals.reset_order_summary") as reset_order_summary:
+            order.delete()
+        recompute_totals.assert_not_called()
+        reset_order_summary.assert_called_once_with(self.order_room.pk)
+
+    def test_item_delete_recomputes_its_order(self):
+        order = Order.objects.create(fk_user=self.user, fk_order_room=self.order_room, finished_ordering=True)
+        OrderItem.objects.bulk_create(OrderItem(fk_order=order, fk_menu_item=self.menu_item, quantity=1) for _ in range(2))
+        with mock.patch("orderApp.signals.reset_order_summary") as reset_order_summary:
+            OrderItem.objects.filter(fk_order=order).first().delete()
+        order.refresh_from_db()
+        self.assertEqual(order.items_count, 1)
+        reset_order_summary.assert_called_once_with(self.order_room.pk)
+
+
+class SummaryCacheChannelTests(SimpleTestCase):
+    room_pk = 1000
+
+    async def test_other_processes_invalidate_through_the_channel_layer(self):
+        await summary_cache.asubscribe(self.room_pk)
+        try:
+            summary_cache.get(self.room_pk, lambda: "summary")
+            self.assertIn(self.room_pk, summary_cache.entries)
+            # * what reset_order_summary sends from another process
+            await get_channel_layer().group_send(summary_cache.get_group(self.room_pk), {"type": "summary.invalidate", "room_pk": self.room_pk})
+            for _ in range(100):
+                if self.room_pk not in summary_cache.entries:
+                    break
+                await asyncio.sleep(0.01)
+            self.assertNotIn(self.room_pk, summary_cache.entries)
+        finally:
+            await summary_cache.aunsubscribe(self.room_pk)
+            summary_cache.listener.cancel()
+
+
+class OrderSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserModel.objects.create_user("user", "user@example.com", "password")
+        order_group = OrderGroup.objects.create(name="group", fk_owner=cls.user)
+        cls.order_room = OrderRoom.objects.create(name="room", fk_order_group=order_group)
+        cls.order_room.add_user_to_room(cls.user)
+        cls.menu_item = MenuItem.objects.create(fk_restaurant=Restaurant.objects.create(name="restaurant"), name="item", price=Decimal("2.50"))
+
+    def test_items_without_a_snapshot_use_their_menu_item(self):
+        order = Order.objects.create(fk_user=self.user, fk_order_room=self.order_room, finished_ordering=True)
+        OrderItem.objects.create(fk_order=order, fk_menu_item=self.menu_item, quantity=1)
+        # * bulk_create skips OrderItem.save, so neither price nor names are snapshotted
+        OrderItem.objects.bulk_create([OrderItem(fk_order=order, fk_menu_item=self.menu_item, quantity=2)])
+        summary = OrderSelectionContext(user=self.user, order_room=self.order_room).groupOrderSummary()
+        self.assertEqual(summary["grand_totals_orderTotalSummary"], {"quantity": 3, "total": Decimal("7.50")})
+        self.assertEqual(list(summary["orderTotalSummaryGrouped"]), ["restaurant"])
+        self.assertEqual([row["item"] for row in summary["orderTotalSummaryGrouped"]["restaurant"]], ["item"])
+
+    def test_order_total_matches_the_summary_for_items_without_a_snapshot(self):
+        order = Order.objects.create(fk_user=self.user, fk_order_room=self.order_room, finished_ordering=True)
+        OrderItem.objects.create(fk_order=order, fk_menu_item=self.menu_item, quantity=1)
+        OrderItem.objects.bulk_create([OrderItem(fk_order=order, fk_menu_item=self.menu_item, quantity=2)])
+        self.assertTrue(OrderItem.objects.filter(fk_order=order, price__isnull=True).exists())
+        Order.recompute_totals(pk=order.pk)
+        order.refresh_from_db()
+        summary = OrderSelectionContext(user=self.user, order_room=self.order_room).groupOrderSummary()
+        self.assertEqual(order.items_count, 2)
+        self.assertEqual(order.total, Decimal("7.50"))
+        self.assertEqual(order.total, summary["grand_totals_orderTotalSummary"]["total"])
+
+
+class TrafficStatsTests(SimpleTestCase):
+    def record(self, stats, messages):
+        compressor = stats.compressor()
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            for message_type, text_data in messages:
+                stats.record(message_type, text_data, compressor)
+        return output.getvalue()
+
+    @override_settings(WS_TRAFFIC_REPORT_INTERVAL=60)
+    def test_messages_are_aggregated_until_the_interval(self):
+        stats = TrafficStats()
+        output = self.record(stats, [("updatePageBody", "<tr></tr>" * 200), ("updateUsersCount", "<td>1</td>"), ("updateUsersCount", "<td>2</td>")])
+        self.assertEqual(output, "")
+        report = dict(stats.report())
+        self.assertEqual(report["updateUsersCount"], {"messages": 2, "raw": 20, "compressed": 20})
+        self.assertLess(report["updatePageBody"]["compressed"], report["updatePageBody"]["raw"])
+
+    @override_settings(WS_TRAFFIC_REPORT_INTERVAL=0)
+    def test_totals_are_printed_once_the_interval_passed(self):
+        output = self.record(TrafficStats(), [("updatePageBody", "<tr></tr>" * 200), ("updateUsersCount", "<td>1</td>")])
+        self.assertIn("[WS-BYTES] updateUsersCount: 1 msgs, 10 raw -> 10 deflate", output)
+
+
+class UpdateCoalescerTests(SimpleTestCase):
+    @override_settings(WS_TRAFFIC_STATS=True, WS_TRAFFIC_REPORT_INTERVAL=0)
+    async def test_connects_within_one_window_are_collapsed_and_reported(self):
+        coalescer, sent = UpdateCoalescer("updateConnectedUsers", window=0.05), []
+
+        async def send_count(count):
+            sent.append(count)
+
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            for count in range(1, 6):
+                await coalescer.schedule("room", lambda count=count: send_count(count))
+            await asyncio.sleep(0.2)
+        self.assertEqual(sent, [5])
+        self.assertEqual(coalescer.report(), {"scheduled": 5, "sent": 1, "collapsed": 4})
+        self.assertIn("[WS-COALESCE] updateConnectedUsers: 5 scheduled, 1 sent, 4 collapsed", output.getvalue())
+
+
+class MemoryPresenceTests(SimpleTestCase):
+    @override_settings(PRESENCE_BACKEND="orderApp.presence.MemoryPresence")
+    def test_refused_with_several_workers(self):
+        check_workers(1)
+        with self.assertRaises(ImproperlyConfigured):
+            check_workers(4)
+
+    @override_settings(PRESENCE_BACKEND="orderApp.presence.DatabasePresence")
+    def test_database_presence_allows_several_workers(self):
+        check_workers(4)
+
+    async def test_prune_discards_through_the_worker_loop(self):
+        presence, layer = MemoryPresence(), get_channel_layer()
+        channel = await layer.new_channel()
+        # * like the consumers, from a worker thread of the socket's loop
+        await sync_to_async(presence.add)("GROUP_room", channel)
+        self.assertIs(presence.loop, asyncio.get_running_loop())
+        # * like cleaner.py, from a thread outside the loop
+        await asyncio.to_thread(presence.prune_presences, -1)
+        await asyncio.sleep(0.05)
+        self.assertEqual(presence.connected_users_many(["GROUP_room"]), {"GROUP_room": 0})
+        await layer.group_send("GROUP_room", {"type": "test.message"})
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(layer.receive(channel), 0.1)
@@ -0,0 +1,53 @@
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+
+class TrafficStats:
+    """
+    Bytes sent per websocket message type, raw and as permessage-deflate would send them.
+
+    Every connection keeps its own deflate stream with the extension defaults
+    (15 window bits, memLevel 5, context takeover) so the compressed sizes match
+    what core.websocket puts on the wire, threshold included. The totals are printed
+    every settings.WS_TRAFFIC_REPORT_INTERVAL seconds, not per message.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = defaultdict(Counter)
+        self.reported_at = time.monotonic()
+
+    def compressor(self):
+        return zlib.compressobj(wbits=-15, memLevel=5)
+
+    def record(self, message_type, text_data, compressor):
+        data = text_data.encode()
+        compressed = len(data)
+        if compressed >= settings.WS_COMPRESSION_THRESHOLD:
+            # * sync flush ends with 00 00 ff ff which permessage-deflate strips
+            compressed = len(compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)) - 4
+        with self.lock:
+            entry = self.stats[message_type]
+            entry["messages"] += 1
+            entry["raw"] += len(data)
+            entry["compressed"] += compressed
+            now = time.monotonic()
+            if now - self.reported_at < settings.WS_TRAFFIC_REPORT_INTERVAL:
+                return
+            self.reported_at = now
+        self.print_report()
+
+    def print_report(self):
+        for message_type, entry in self.report():
+            print(f"[WS-BYTES] {message_type}: {entry['messages']} msgs, {entry['raw']} raw -> {entry['compressed']} deflate")
+
+    def report(self):
+        with self.lock:
+            return sorted(((message_type, dict(entry)) for message_type, entry in self.stats.items()), key=lambda item: item[1]["raw"], reverse=True)
+
+
+ws_traffic = TrafficStats()
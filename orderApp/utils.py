@@ -1,10 +1,12 @@
 from collections import defaultdict
-from decimal import Decimal
-from itertools import groupby
-from operator import itemgetter
+from datetime import timedelta
+from pathlib import Path
 
+from django.conf import settings
 from django.core.validators import BaseValidator
-from django.template.loader import render_to_string
+from django.template import engines
+from django.template.loader import get_template, render_to_string
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -16,72 +18,95 @@ class PositiveValueValidator(BaseValidator):
         return a <= b
 
 
-def templates_builder(context, templates, chunks=True):
+def templates_builder(context, templates, chunks=None):
+    # * settings.WS_SINGLE_FRAME packs every fragment of a handler into one websocket frame
+    if chunks is None:
+        chunks = not settings.WS_SINGLE_FRAME
     rendered_templates = [render_to_string(template, context=context) for template in templates]
-    if chunks:
+    if chunks or not rendered_templates:
         return rendered_templates
     else:
         return ["".join(rendered_templates)]
 
 
-def group_nested_data(data, group_keys):
+def warm_up_templates():
     """
-    Groups a list of dictionaries by the specified keys.
-
-    :param data: List of dictionaries to be grouped.
-    :param group_keys: List of keys to group by, in order of grouping.
-    :return: Nested dictionary with grouped data.
+    Compile every template of the project template dirs into the cached loader (settings.TEMPLATES),
+    so the first websocket message of a worker doesn't parse the extends/include chains. Returns their names.
     """
-    if not group_keys:
-        return data
-
-    # Sort data by the current group key
-    data = sorted(data, key=itemgetter(group_keys[0]))
-    # To avoid extra list wraps in nested groups
-    if len(group_keys) > 1:
-        grouped_data = defaultdict(dict)
-    else:
-        grouped_data = defaultdict(list)
+    names = sorted({path.relative_to(directory).as_posix() for directory in map(Path, engines["django"].engine.dirs) for path in directory.rglob("*.html")})
+    for name in names:
+        try:
+            get_template(name)
+        except Exception as e:
+            # ! a broken template fails its own render, not the worker boot
+            print(e)
+    return names
 
-    # Group by the first key in the group_keys list
-    for key, group in groupby(data, key=itemgetter(group_keys[0])):
-        # If there are more keys to group by, call the function recursively
-        if len(group_keys) > 1:
-            # Group the remaining data by the next key(s)
-            grouped_data[key].update(group_nested_data(list(group), group_keys[1:]))
-        else:
-            # If this is the last key, append the group as is
-            grouped_data[key].extend(list(group))
 
-    # Convert defaultdict to a regular dict for the final output
-    return dict(grouped_data)
+def business_day_range(moment=None):
+    """Start and end of the local day holding ``moment`` (now by default), to filter datetimes by range instead of ``__date``."""
+    start = timezone.localtime(moment).replace(hour=0, minute=0, second=0, microsecond=0)
+    return start, start + timedelta(days=1)
 
 
-def calculate_totals(data, keys):
-    """
-    Calculate the total for specified keys across a list of dictionaries.
+def summary_totals():
+    return {"quantity": 0, "total": 0}
 
-    :param data: List of dictionaries containing data to sum.
-    :param keys: List of keys to sum up in the dictionaries.
-    :return: Dictionary with the total sums for each specified key.
-    """
-    if not keys:
-        return data
 
-    totals = {key: 0 for key in keys}
+def add_summary_line(group, totals, key, quantity, total, keys):
+    # * one summary row per price and item, same shape as the ``values()`` rows of the grouped queries
+    row = group.get(key)
+    if row is None:
+        row = group[key] = {"price": key[0], "item": key[1], **keys, "quantity": 0, "total": 0}
+    row["quantity"] += quantity
+    row["total"] += total
+    totals["quantity"] += quantity
+    totals["total"] += total
+
 
-    for item in data:
-        for key in keys:
-            value = item.get(key, 0)
-            if isinstance(value, (int, float, Decimal)):
-                totals[key] += value
+def sorted_summary(groups, depth):
+    """Sort ``depth`` levels of group keys, then the rows of every group by price and item."""
+    if depth == 0:
+        return [groups[key] for key in sorted(groups)]
+    return {key: sorted_summary(groups[key], depth - 1) for key in sorted(groups)}
 
-    return totals
 
+def sorted_totals(totals, depth=1):
+    if depth == 0:
+        return totals
+    return {key: sorted_totals(totals[key], depth - 1) for key in sorted(totals)}
 
-def spacial_rounder(dict_in_iterable, fields, round_num):
-    # ! implemented to round output field as it's not supported in sqlite3
-    # https://docs.djangoproject.com/en/5.2/ref/databases/#decimal-handling
-    for item in dict_in_iterable:
-        for field in fields:
-            item[field] = round(item[field], round_num)
+
+def build_order_summary(rows):
+    """
+    Build every grouping and total of the group order summary in a single pass over the order items.
+
+    :param rows: Iterable of dictionaries with restaurant, user, item, price, finished, quantity and total keys,
+                 order items either one by one or already summed per the other keys.
+    :return: Dictionary with the summary tables context, restaurant and restaurant then user groups cover
+             every order of the room, user then restaurant groups only the finished ones.
+    """
+    restaurants, restaurant_users, user_restaurants = defaultdict(dict), defaultdict(lambda: defaultdict(dict)), defaultdict(lambda: defaultdict(dict))
+    restaurant_totals, restaurant_user_totals, user_totals = defaultdict(summary_totals), defaultdict(lambda: defaultdict(summary_totals)), defaultdict(summary_totals)
+    grand_totals = summary_totals()
+    for row in rows:
+        restaurant, user, quantity = row["restaurant"], row["user"], row["quantity"]
+        # ! sums may come back from sqlite with float noise, price is null for items written without save()
+        key, total = (round(row["price"] or 0, 2), row["item"]), round(row["total"] or 0, 2)
+        add_summary_line(restaurants[restaurant], restaurant_totals[restaurant], key, quantity, total, {"restaurant": restaurant})
+        add_summary_line(restaurant_users[restaurant][user], restaurant_user_totals[restaurant][user], key, quantity, total, {"restaurant": restaurant, "user": user})
+        grand_totals["quantity"] += quantity
+        grand_totals["total"] += total
+        if row["finished"]:
+            add_summary_line(user_restaurants[user][restaurant], user_totals[user], key, quantity, total, {"user": user, "restaurant": restaurant})
+
+    return {
+        "orderTotalSummaryGrouped": sorted_summary(restaurants, 1),
+        "totals_orderTotalSummary": sorted_totals(restaurant_totals),
+        "grand_totals_orderTotalSummary": grand_totals,
+        "orderUsersTotalSummaryGrouped": sorted_summary(restaurant_users, 2),
+        "totals_orderUsersTotalSummaryGrouped": sorted_totals(restaurant_user_totals, 2),
+        "orderUsersRestaurantSummaryGrouped": sorted_summary(user_restaurants, 2),
+        "totals_orderUsersSummaryGrouped": sorted_totals(user_totals),
+    }